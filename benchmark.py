@@ -0,0 +1,209 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from vector import Vector
+from line import Line
+from plane import Plane
+from linesys import LinearSystem
+from linebatch import LineBatch
+from vectorbatch import VectorBatch
+
+MIN_SECONDS = 0.2
+
+
+def _random_system(size, rng):
+    # Diagonally dominant, so every size has a unique, well-conditioned answer.
+    matrix = rng.uniform(-1, 1, size=(size, size + 1))
+    matrix[:, :size] += size * np.eye(size)
+    return LinearSystem.from_matrix(matrix)
+
+
+def bench_vector_dot(size, rng):
+    v = Vector(rng.normal(size=size).tolist())
+    w = Vector(rng.normal(size=size).tolist())
+    return lambda: v.dot(w)
+
+
+def bench_vector_batch_dot(size, rng):
+    v = VectorBatch(rng.normal(size=(size, 3)))
+    w = VectorBatch(rng.normal(size=(size, 3)))
+    return lambda: v.dot(w)
+
+
+def bench_line_intersect(size, rng):
+    lines = [Line(Vector(rng.normal(size=2).tolist()), float(rng.normal())) for _ in range(size + 1)]
+
+    def run():
+        for l1, l2 in zip(lines, lines[1:]):
+            l1.intersect_with(l2)
+    return run
+
+
+def bench_line_batch_all_pairs(size, rng):
+    batch = LineBatch(rng.normal(size=(size, 2)), rng.normal(size=size))
+    return lambda: batch.intersect_all(batch)
+
+
+def bench_plane_construct_eq(size, rng):
+    # Bulk construction plus __eq__ against a scaled copy of every plane,
+    # which computes both basepoints on first use.
+    coordinates = rng.normal(size=(size, 3)).tolist()
+    constants = rng.normal(size=size).tolist()
+
+    def run():
+        planes = [Plane(Vector(n), k) for n, k in zip(coordinates, constants)]
+        scaled = [Plane(Vector([2 * x for x in n]), 2 * k) for n, k in zip(coordinates, constants)]
+        for p1, p2 in zip(planes, scaled):
+            p1 == p2
+    return run
+
+
+def bench_triangular_reference(size, rng):
+    system = _random_system(size, rng)
+    return system.compute_triangular_form
+
+
+def bench_triangular_dense(size, rng):
+    system = _random_system(size, rng)
+    return system.compute_triangular_form_dense
+
+
+def bench_triangular_blocked(size, rng):
+    system = _random_system(size, rng)
+    return system.compute_triangular_form_blocked
+
+
+def bench_triangular_blocked_threaded(size, rng):
+    system = _random_system(size, rng)
+    return lambda: system.compute_triangular_form_blocked(threads=os.cpu_count() or 1)
+
+
+def bench_solve(size, rng):
+    system = _random_system(size, rng)
+    return system.solve
+
+
+def bench_solve_blocked(size, rng):
+    system = _random_system(size, rng)
+    return system.solve_blocked
+
+
+BENCHMARKS = {
+    'vector_dot': (bench_vector_dot, [2, 3, 10, 100, 1000]),
+    'vector_batch_dot': (bench_vector_batch_dot, [1000, 100000]),
+    'line_intersect': (bench_line_intersect, [10, 100, 1000]),
+    'line_batch_all_pairs': (bench_line_batch_all_pairs, [10, 100, 1000]),
+    'plane_construct_eq': (bench_plane_construct_eq, [10, 100, 1000]),
+    'linesys_triangular_reference': (bench_triangular_reference, [3, 10, 30, 100]),
+    'linesys_triangular_dense': (bench_triangular_dense, [3, 10, 100, 300, 1000]),
+    'linesys_triangular_blocked': (bench_triangular_blocked, [3, 10, 100, 300, 1000]),
+    'linesys_triangular_threaded': (bench_triangular_blocked_threaded, [300, 1000]),
+    'linesys_solve': (bench_solve, [3, 10, 100, 300, 1000]),
+    'linesys_solve_blocked': (bench_solve_blocked, [3, 10, 100, 300, 1000]),
+}
+
+
+def measure(factory, size, seed=0):
+    fn = factory(size, np.random.default_rng(seed))
+    fn()
+
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < MIN_SECONDS or calls < 3:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'seconds_per_call': elapsed / calls,
+        'throughput': calls / elapsed,
+        'peak_memory_bytes': peak,
+    }
+
+
+def run(names=None, max_size=None):
+    results = []
+    for name, (factory, sizes) in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        for size in sizes:
+            if max_size is not None and size > max_size:
+                continue
+            result = {'name': name, 'size': size}
+            result.update(measure(factory, size))
+            results.append(result)
+            print('{:<30} {:>7} {:>14.1f} calls/s {:>12} B peak'.format(
+                name, size, result['throughput'], result['peak_memory_bytes']))
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    # A benchmark regresses when its throughput drops, or its peak memory
+    # grows, by more than the threshold fraction relative to the baseline.
+    previous = {(r['name'], r['size']): r for r in baseline['results']}
+    regressions = []
+    for r in current['results']:
+        old = previous.get((r['name'], r['size']))
+        if old is None:
+            continue
+        if r['throughput'] < old['throughput'] * (1 - threshold):
+            regressions.append('{} [{}]: throughput {:.1f} -> {:.1f} calls/s'.format(
+                r['name'], r['size'], old['throughput'], r['throughput']))
+        if r['peak_memory_bytes'] > old['peak_memory_bytes'] * (1 + threshold) + 1024:
+            regressions.append('{} [{}]: peak memory {} -> {} B'.format(
+                r['name'], r['size'], old['peak_memory_bytes'], r['peak_memory_bytes']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark vector, line, plane and linear system operations.')
+    parser.add_argument('--only', nargs='*', help='benchmark names to run (default: all)')
+    parser.add_argument('--max-size', type=int, help='skip sizes above this value')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed relative slowdown or memory growth (default: 0.25)')
+    parser.add_argument('--list', action='store_true', help='list the benchmarks and their sizes')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (_, sizes) in BENCHMARKS.items():
+            print('{:<30} {}'.format(name, sizes))
+        return 0
+
+    current = run(args.only, args.max_size)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        for r in regressions:
+            print('REGRESSION ' + r)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
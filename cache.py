@@ -0,0 +1,331 @@
+import collections
+import copy
+import hashlib
+import math
+import pickle
+import sqlite3
+import threading
+import time
+
+from vector import Vector
+from linesys import LinearSystem
+
+# Content-addressed results: a key is the SHA-256 of a canonical text form
+# of the equations, so the same question asked again (by any caller, in any
+# process sharing the on-disk tier) finds the earlier answer.
+
+
+def _canonical_row(values):
+    # Scaling an equation does not change its solution set, so rows are
+    # divided by the magnitude of their normal vector (or of the constant
+    # term when the normal vector is zero) and given a positive leading
+    # coefficient. The scaled doubles are written exactly (float.hex):
+    # nearly equal equations can have very different solutions, so only
+    # bit-identical rows share a key.
+    values = [float(x) for x in values]
+    scale = math.sqrt(sum([x * x for x in values[:-1]])) or abs(values[-1]) or 1.0
+    values = [x / scale for x in values]
+    leading = next((x for x in values if x != 0), 0.0)
+    if leading < 0:
+        values = [-x for x in values]
+    return ','.join([(x + 0.0).hex() for x in values])
+
+
+def canonical_key(kind, rows, ordered=False):
+    # rows are (coefficients..., constant term). Unless ordered is set the
+    # rows are sorted, since the order of the equations does not change the
+    # answer either.
+    rows = [_canonical_row(row) for row in rows]
+    if not ordered:
+        rows.sort()
+    text = '{}|{}'.format(kind, ';'.join(rows))
+    return hashlib.sha256(text.encode('ascii')).hexdigest()
+
+
+def exact_key(kind, rows):
+    # For answers that depend on the exact input (row order, scale and
+    # number type), such as the triangular form.
+    text = '{}|{}'.format(kind, ';'.join([','.join(['{}:{!r}'.format(type(x).__name__, x) for x in row])
+                                          for row in rows]))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _rows(system):
+    return [list(p.normal_vector) + [p.constant_term] for p in system]
+
+
+class CacheStats(object):
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self.disk_writes = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'disk_hits': self.disk_hits,
+            'disk_writes': self.disk_writes,
+            'hit_rate': self.hit_rate(),
+        }
+
+    def __str__(self):
+        return 'CacheStats: {}'.format(self.as_dict())
+
+
+class ResultCache(object):
+    # Opt-in memoization of solves, line intersections and triangular forms.
+    # The memory tier is an LRU bounded by both max_entries and max_bytes
+    # (measured as the pickled size of each result). With a path, results
+    # are also written through to a sqlite database, which is consulted on
+    # a memory miss and survives restarts; max_disk_entries bounds it by
+    # least recent use. Only point it at files this cache wrote, since
+    # entries are unpickled.
+    #
+    # Vectors are immutable and handed out as they are; any other result is
+    # deep-copied on the way out, so callers can never change a cached
+    # answer.
+    NO_SOLUTIONS = 'no_solutions'
+    PARALLEL = 'parallel'
+    COINCIDENT = 'coincident'
+
+    def __init__(self, max_entries=4096, max_bytes=16 * 2 ** 20, path=None, max_disk_entries=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_entries = max_disk_entries
+        self.stats = CacheStats()
+        self.bytes = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS results '
+                             '(key TEXT PRIMARY KEY, value BLOB NOT NULL, used REAL NOT NULL)')
+            self._db.commit()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _share(self, value):
+        if value is None or isinstance(value, (Vector, str)):
+            return value
+        return copy.deepcopy(value)
+
+    def _remember(self, key, value, size):
+        if key in self._entries:
+            self.bytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            self.bytes -= self._entries.popitem(last=False)[1][1]
+            self.stats.evictions += 1
+
+    def get(self, key):
+        # Returns (found, value).
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return True, self._share(entry[0])
+            if self._db is not None:
+                row = self._db.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    self._db.execute('UPDATE results SET used = ? WHERE key = ?', (time.time(), key))
+                    self._db.commit()
+                    value = pickle.loads(row[0])
+                    self._remember(key, value, len(row[0]))
+                    self.stats.hits += 1
+                    self.stats.disk_hits += 1
+                    return True, self._share(value)
+            self.stats.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        value = self._share(value)
+        with self._lock:
+            self._remember(key, value, len(data))
+            if self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?)', (key, data, time.time()))
+                if self.max_disk_entries is not None:
+                    self._db.execute('DELETE FROM results WHERE key NOT IN '
+                                     '(SELECT key FROM results ORDER BY used DESC LIMIT ?)', (self.max_disk_entries,))
+                self._db.commit()
+                self.stats.disk_writes += 1
+
+    def memoize(self, key, compute):
+        found, value = self.get(key)
+        if not found:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def solve(self, system):
+        # LinearSystem.solve, including its NO_SOLUTIONS_MSG exception.
+        def compute():
+            try:
+                return system.solve()
+            except Exception as e:
+                if str(e) == LinearSystem.NO_SOLUTIONS_MSG:
+                    return self.NO_SOLUTIONS
+                raise e
+
+        result = self.memoize(canonical_key('solve', _rows(system)), compute)
+        if result == self.NO_SOLUTIONS:
+            raise Exception(LinearSystem.NO_SOLUTIONS_MSG)
+        return result
+
+    def intersect(self, line1, line2):
+        # Line.intersect_with; coincident lines give back line1 itself.
+        def compute():
+            result = line1.intersect_with(line2)
+            if result is None:
+                return self.PARALLEL
+            if result is line1:
+                return self.COINCIDENT
+            return result
+
+        rows = [list(line1.normal_vector) + [line1.constant_term], list(line2.normal_vector) + [line2.constant_term]]
+        result = self.memoize(canonical_key('intersect', rows), compute)
+        if result == self.PARALLEL:
+            return None
+        if result == self.COINCIDENT:
+            return line1
+        return result
+
+    def triangular_form(self, system):
+        return self.memoize(exact_key('triangular', _rows(system)), system.compute_triangular_form)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            if self._db is not None:
+                self._db.execute('DELETE FROM results')
+                self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import timeit
+    from decimal import Decimal
+    from plane import Plane
+    from line import Line
+    from linesys import Parametrization
+
+    p1 = Plane(normal_vector=Vector([0, 1, 1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1, -1, 1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1, 2, -5]), constant_term=3)
+    s = LinearSystem([p1, p2, p3])
+    cache = ResultCache()
+
+    x = cache.solve(s)
+    # Reordered equations, and equations scaled without rounding (here by
+    # powers of two), are the same question.
+    scaled = LinearSystem([Plane(normal_vector=Vector([-2, -4, 10]), constant_term=-6), p1,
+                           Plane(normal_vector=Vector([4, -4, 4]), constant_term=8)])
+    if not (x == s.solve() and cache.solve(scaled) is x and
+                    cache.stats.hits == 1 and cache.stats.misses == 1):
+        print('test case 1 failed')
+
+    # Nearly equal constants, very different answers: never a shared entry.
+    near = [LinearSystem([Plane(normal_vector=Vector([1, 1, 0]), constant_term=2),
+                          Plane(normal_vector=Vector([1, 1 + 1e-9, 0]), constant_term=2 + delta),
+                          Plane(normal_vector=Vector([0, 0, 1]), constant_term=1)]) for delta in (0.0, 3e-13)]
+    if not (cache.solve(near[0]) == near[0].solve() and cache.solve(near[1]) == near[1].solve() and
+                    cache.stats.hits == 1):
+        print('test case 1a failed')
+
+    inconsistent = LinearSystem([Plane(normal_vector=Vector([1, 1, 1]), constant_term=1),
+                                 Plane(normal_vector=Vector([1, 1, 1]), constant_term=2)])
+    infinite = LinearSystem([Plane(normal_vector=Vector([1, 1, 1]), constant_term=1),
+                             Plane(normal_vector=Vector([0, 1, 1]), constant_term=2)])
+    for _ in range(2):
+        try:
+            cache.solve(inconsistent)
+            print('test case 2 failed')
+        except Exception as e:
+            if str(e) != LinearSystem.NO_SOLUTIONS_MSG:
+                print('test case 2 failed')
+    first = cache.solve(infinite)
+    first.direction_vectors.append(Vector([1, 1, 1]))
+    second = cache.solve(infinite)
+    if not (isinstance(second, Parametrization) and len(second.direction_vectors) == 1):
+        print('test case 3 failed')
+
+    l1 = Line(Vector([4.046, 2.836]), 1.21)
+    l2 = Line(Vector([10.115, 7.09]), 3.025)
+    l3 = Line(Vector([7.204, 3.182]), 8.68)
+    l4 = Line(Vector([8.172, 4.114]), 9.883)
+    l5 = Line(Vector([1.182, 5.562]), 6.744)
+    l6 = Line(Vector([1.773, 8.343]), 9.525)
+    if not (cache.intersect(l1, l2) is l1 and cache.intersect(l2, l1) is l2 and
+                    cache.intersect(l3, l4) == l3.intersect_with(l4) and
+                    cache.intersect(l4, l3) == l3.intersect_with(l4) and
+                    cache.intersect(l5, l6) is None and cache.intersect(l5, l6) is None):
+        print('test case 4 failed')
+
+    t = LinearSystem([Plane(normal_vector=Vector([1, 1, 1]), constant_term=1),
+                      Plane(normal_vector=Vector([1, 1, 1]), constant_term=2),
+                      Plane(normal_vector=Vector([1, 1, 0]), constant_term=3)])
+    triangular = cache.triangular_form(t)
+    triangular[0] = Plane(normal_vector=Vector([9, 9, 9]), constant_term=9)
+    as_decimals = LinearSystem([Plane(Vector([Decimal(x) for x in p.normal_vector]), Decimal(p.constant_term))
+                                for p in t])
+    if not (str(cache.triangular_form(t)) == str(t.compute_triangular_form()) and
+                    cache.triangular_form(as_decimals) is not None and
+                    str(cache.triangular_form(as_decimals)) == str(as_decimals.compute_triangular_form())):
+        print('test case 5 failed')
+
+    small = ResultCache(max_entries=2)
+    for v in range(4):
+        small.put('k{}'.format(v), Vector([v]))
+    small.get('k2')
+    small.put('k4', Vector([4]))
+    if not (list(small._entries) == ['k2', 'k4'] and small.stats.evictions == 3):
+        print('test case 6 failed')
+    tight = ResultCache(max_bytes=1000)
+    for v in range(20):
+        tight.put(v, Vector([float(v)] * 10))
+    if not (0 < tight.bytes <= 1000 and len(tight) < 20 and tight.stats.evictions == 20 - len(tight)):
+        print('test case 7 failed')
+
+    path = os.path.join(tempfile.mkdtemp(), 'results.sqlite')
+    disk = ResultCache(path=path)
+    disk.solve(s)
+    disk.solve(infinite)
+    disk.close()
+    restarted = ResultCache(path=path)
+    if not (restarted.solve(s) == x and isinstance(restarted.solve(infinite), Parametrization) and
+                    restarted.stats.disk_hits == 2 and restarted.solve(s) == x and restarted.stats.disk_hits == 2):
+        print('test case 8 failed')
+    restarted.close()
+    bounded = ResultCache(path=path, max_disk_entries=1)
+    bounded.put('extra', Vector([1]))
+    if not len(bounded._db.execute('SELECT key FROM results').fetchall()) == 1:
+        print('test case 9 failed')
+    bounded.close()
+
+    print('repeated 3x3 solve: uncached {:.1f} us, cached {:.1f} us'.format(
+        1e6 * min(timeit.repeat(s.solve, number=1000, repeat=3)) / 1000,
+        1e6 * min(timeit.repeat(lambda: cache.solve(s), number=1000, repeat=3)) / 1000))
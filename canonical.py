@@ -0,0 +1,198 @@
+import itertools
+import math
+
+
+class CanonicalIndex(object):
+    # Items within the tolerances used by Vector.is_parallel and
+    # Line/Plane.__eq__ land in the same or a neighbouring bucket, so a
+    # lookup probes the neighbours of coordinates that sit near a bucket
+    # boundary and confirms every candidate with the real predicate.
+    #
+    # The exception is __eq__ on a small normal vector: it rounds
+    # n . (p1 - p2) to DOT_SLACK, which allows DOT_SLACK / |n| in the
+    # distance d, and below |n| ~ 1e-6 that spans several buckets. Such a
+    # lookup checks every member of the direction family instead.
+    BOUNDARY_MARGIN = 0.25
+    # Vector.dot rounds to 10 decimal places.
+    DOT_SLACK = 5e-11
+
+    def __init__(self, resolution=1e-4):
+        self.resolution = resolution
+        self._families = {}
+        self._equal = {}
+        self._zero = []
+        self._size = 0
+
+    def _canonical(self, item):
+        n = [float(x) for x in item.normal_vector]
+        magnitude = math.sqrt(sum([x * x for x in n]))
+        if magnitude == 0:
+            return None, None
+        u = [x / magnitude for x in n]
+        d = float(item.constant_term) / magnitude
+        leading = next(x for x in u if abs(x) * 2 > self.resolution)
+        if leading < 0:
+            u = [-x for x in u]
+            d = -d
+        return u, d
+
+    def _key(self, values):
+        return tuple(int(math.floor(x / self.resolution + 0.5)) for x in values)
+
+    def _probe_keys(self, values):
+        options = []
+        for x in values:
+            scaled = x / self.resolution + 0.5
+            k = int(math.floor(scaled))
+            offset = scaled - k
+            if offset < self.BOUNDARY_MARGIN:
+                options.append((k, k - 1))
+            elif offset > 1 - self.BOUNDARY_MARGIN:
+                options.append((k, k + 1))
+            else:
+                options.append((k,))
+        return itertools.product(*options)
+
+    def _probes(self, u, d):
+        # Both orientations are probed, which makes the lookup independent of
+        # how a nearly-zero leading coordinate was sign-normalized.
+        for sign in (1, -1):
+            for key in self._probe_keys([sign * x for x in u] + [sign * d]):
+                yield key
+
+    def _family_candidates(self, u, d):
+        seen = set()
+        for key in self._probes(u, d):
+            direction_key = key[:-1]
+            if direction_key in seen:
+                continue
+            seen.add(direction_key)
+            for member in self._families.get(direction_key, ()):
+                yield member
+
+    def _equal_candidates(self, item, u, d):
+        if self.DOT_SLACK / item.normal_vector.magnitude() > self.BOUNDARY_MARGIN * self.resolution:
+            for member in self._family_candidates(u, d):
+                yield member
+            return
+        for key in self._probes(u, d):
+            for member in self._equal.get(key, ()):
+                yield member
+
+    def find_equal(self, item):
+        u, d = self._canonical(item)
+        if u is None:
+            return self._zero[0] if self._zero else None
+        for member in self._equal_candidates(item, u, d):
+            if item == member:
+                return member
+        return None
+
+    def find_parallel(self, item):
+        u, d = self._canonical(item)
+        if u is None:
+            return list(self)
+        members = [m for m in self._family_candidates(u, d) if item.is_parallel(m)]
+        return members + list(self._zero)
+
+    def add(self, item):
+        existing = self.find_equal(item)
+        if existing is not None:
+            return existing
+
+        u, d = self._canonical(item)
+        if u is None:
+            self._zero.append(item)
+        else:
+            key = self._key(u + [d])
+            self._families.setdefault(key[:-1], []).append(item)
+            self._equal.setdefault(key, []).append(item)
+        self._size += 1
+        return item
+
+    def add_many(self, items):
+        return [self.add(item) for item in items]
+
+    @classmethod
+    def dedup(cls, items, resolution=1e-4):
+        index = cls(resolution)
+        unique = []
+        for item in items:
+            if index.add(item) is item:
+                unique.append(item)
+        return unique
+
+    def parallel_families(self):
+        # Buckets whose directions are within tolerance of each other are
+        # merged, so a family never gets split across a bucket boundary.
+        families = []
+        assigned = set()
+        for members in self._families.values():
+            for member in members:
+                if id(member) in assigned:
+                    continue
+                u, d = self._canonical(member)
+                family = [m for m in self._family_candidates(u, d)
+                          if id(m) not in assigned and member.is_parallel(m)]
+                assigned.update(id(m) for m in family)
+                families.append(family)
+        if self._zero:
+            families.append(list(self._zero))
+        return families
+
+    def __contains__(self, item):
+        return self.find_equal(item) is not None
+
+    def __iter__(self):
+        for members in self._families.values():
+            for member in members:
+                yield member
+        for member in self._zero:
+            yield member
+
+    def __len__(self):
+        return self._size
+
+
+if __name__ == "__main__":
+    from vector import Vector
+    from plane import Plane
+    from line import Line
+
+    p1 = Plane(Vector([-0.412, 3.806, 0.728]), -3.46)
+    p2 = Plane(Vector([1.03, -9.515, -1.82]), 8.65)
+    p3 = Plane(Vector([2.611, 5.528, 0.283]), 4.6)
+    p4 = Plane(Vector([7.715, 8.306, 5.342]), 3.76)
+    p5 = Plane(Vector([-7.926, 8.625, -7.212]), -7.952)
+    p6 = Plane(Vector([-2.642, 2.875, -2.404]), -2.443)
+    planes = [p1, p2, p3, p4, p5, p6]
+
+    unique = CanonicalIndex.dedup(planes)
+    if not unique == [p1, p3, p4, p5, p6]:
+        print('test case 1 failed')
+
+    index = CanonicalIndex()
+    index.add_many(planes)
+    if not (len(index) == 5 and index.find_equal(p2) is p1 and p2 in index):
+        print('test case 2 failed')
+
+    if not (index.find_parallel(p6) == [p5, p6] and index.find_parallel(p3) == [p3]):
+        print('test case 3 failed')
+
+    families = index.parallel_families()
+    if not sorted(len(f) for f in families) == [1, 1, 1, 2]:
+        print('test case 4 failed')
+
+    # x_2 components straddle the sign normalization threshold and a bucket
+    # boundary; the lines are still parallel and must be found.
+    l1 = Line(Vector([1e-9, 1]), 2)
+    l2 = Line(Vector([-1e-9, -1]), -2)
+    index = CanonicalIndex()
+    if not (index.add(l1) is l1 and index.add(l2) is l1 and len(index) == 1):
+        print('test case 5 failed')
+
+    # With a tiny normal, __eq__ tolerates distances several buckets apart.
+    a = Plane(Vector([1e-7, 0, 0]), 1e-7)
+    b = Plane(Vector([1e-7, 0, 0]), 1e-7 * (1 + 3e-4))
+    if not (a == b and CanonicalIndex.dedup([a, b]) == [a]):
+        print('test case 6 failed')
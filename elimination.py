@@ -0,0 +1,334 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import instrument
+
+EPSILON = 1e-10
+BLOCK_SIZE = 32
+
+
+def augmented_matrix(planes):
+    matrix = np.empty((len(planes), planes[0].dimension + 1))
+    matrix[:, :-1] = [p.normal_vector.coordinates for p in planes]
+    matrix[:, -1] = [p.constant_term for p in planes]
+    return matrix
+
+
+def growth(before, after):
+    initial = np.abs(before).max() if before.size else 0.0
+    return float(np.abs(after).max() / initial) if initial else 1.0
+
+
+def _track_growth(matrix, largest):
+    current = float(np.abs(matrix).max()) if matrix.size else 0.0
+    return current if current > largest else largest
+
+
+def triangularize(matrix, tol=None):
+    # The pivot is the first row at or below the current one whose entry in
+    # the column exceeds its row's threshold. compute_triangular_form tests
+    # for an exact nonzero instead; tol (by default row_tolerance) only
+    # absorbs float round-off, so entries that cancelled to ~0 are skipped.
+    if tol is None:
+        tol = row_tolerance(matrix)
+    num_rows, num_columns = matrix.shape
+    tol = _row_thresholds(tol, num_rows)
+    tracking = instrument.enabled
+    if tracking:
+        initial = largest = _track_growth(matrix, 0.0)
+    row = 0
+    for col in range(num_columns - 1):
+        if row >= num_rows:
+            break
+        if tracking:
+            instrument.count('pivot_searches')
+        candidates = np.flatnonzero(np.abs(matrix[row:, col]) > tol[row:])
+        if len(candidates) == 0:
+            continue
+        pivot_row = row + candidates[0]
+        if pivot_row != row:
+            matrix[[row, pivot_row]] = matrix[[pivot_row, row]]
+            tol[[row, pivot_row]] = tol[[pivot_row, row]]
+            if tracking:
+                instrument.count('row_swaps')
+        if row + 1 < num_rows:
+            factors = matrix[row + 1:, col] / matrix[row, col]
+            matrix[row + 1:, col:] -= factors[:, np.newaxis] * matrix[row, col:]
+            matrix[row + 1:, col] = 0
+            if tracking:
+                instrument.count('row_additions', num_rows - row - 1)
+                largest = _track_growth(matrix[row + 1:, col:], largest)
+        row += 1
+    if tracking and initial:
+        instrument.record_growth(largest / initial)
+    return matrix
+
+
+UNIQUE_SOLUTION = 0
+NO_SOLUTION = 1
+INFINITE_SOLUTIONS = 2
+
+
+def row_tolerance(matrix, eps=EPSILON):
+    # One threshold per row (per row of every system for a (K, m, n+1)
+    # stack), relative to that row's largest entry. Scaling one equation
+    # leaves the answer unchanged, and the small entries of one row are
+    # never taken for round-off of the large entries of another.
+    largest = np.abs(matrix).max(axis=-1) if matrix.shape[-1] else np.zeros(matrix.shape[:-1])
+    return np.where(largest > 0, eps * largest, eps)
+
+
+def _row_thresholds(tol, num_rows):
+    # A per-row array is swapped in place along with its rows, so the
+    # caller can hand the same array to classify afterwards.
+    if isinstance(tol, np.ndarray) and tol.ndim:
+        return tol
+    return np.array(np.broadcast_to(tol, (num_rows,)), dtype=np.float64)
+
+
+def reduce_row_echelon(matrix, tol=EPSILON):
+    # Gauss-Jordan with scaled partial pivoting: the pivot is the entry at or
+    # below the current row that is largest relative to its row's threshold,
+    # and a column has no pivot when no entry exceeds its threshold. With a
+    # single tol this is plain partial pivoting.
+    num_rows, num_columns = matrix.shape
+    tol = _row_thresholds(tol, num_rows)
+    tracking = instrument.enabled
+    if tracking:
+        initial = largest = _track_growth(matrix, 0.0)
+    pivot_columns = []
+    row = 0
+    for col in range(num_columns - 1):
+        if row >= num_rows:
+            break
+        if tracking:
+            instrument.count('pivot_searches')
+        ratios = np.abs(matrix[row:, col]) / tol[row:]
+        pivot_row = row + int(np.argmax(ratios))
+        if ratios[pivot_row - row] <= 1:
+            matrix[row:, col] = 0
+            continue
+        if pivot_row != row:
+            matrix[[row, pivot_row]] = matrix[[pivot_row, row]]
+            tol[[row, pivot_row]] = tol[[pivot_row, row]]
+            if tracking:
+                instrument.count('row_swaps')
+        matrix[row, col:] /= matrix[row, col]
+        factors = matrix[:, col].copy()
+        factors[row] = 0
+        matrix[:, col:] -= factors[:, np.newaxis] * matrix[row, col:]
+        matrix[:, col] = 0
+        matrix[row, col] = 1
+        if tracking:
+            instrument.count('row_scalings')
+            instrument.count('row_additions', num_rows - 1)
+            largest = _track_growth(matrix[:, col:], largest)
+        pivot_columns.append(col)
+        row += 1
+    if tracking and initial:
+        instrument.record_growth(largest / initial)
+    return pivot_columns
+
+
+def classify(matrix, pivot_columns, tol=EPSILON):
+    rank = len(pivot_columns)
+    tol = _row_thresholds(tol, matrix.shape[0])
+    if np.any(np.abs(matrix[rank:, -1]) > tol[rank:]):
+        return NO_SOLUTION
+    if rank < matrix.shape[1] - 1:
+        return INFINITE_SOLUTIONS
+    return UNIQUE_SOLUTION
+
+
+def parametrize(matrix, pivot_columns):
+    num_variables = matrix.shape[1] - 1
+    rank = len(pivot_columns)
+    free_columns = [c for c in range(num_variables) if c not in set(pivot_columns)]
+
+    basepoint = np.zeros(num_variables)
+    basepoint[pivot_columns] = matrix[:rank, -1]
+
+    direction_vectors = np.zeros((len(free_columns), num_variables))
+    for k, col in enumerate(free_columns):
+        direction_vectors[k, col] = 1
+        direction_vectors[k, pivot_columns] = -matrix[:rank, col]
+    return basepoint, direction_vectors
+
+
+def reduce_row_echelon_batch(matrices, tol):
+    # reduce_row_echelon applied to a (K, m, n+1) stack at once; every system
+    # keeps its own current row, so pivots may land in different columns.
+    # tol is (K, m), one threshold per row as from row_tolerance, and is
+    # swapped in place along with the rows.
+    num_systems, num_rows, num_columns = matrices.shape
+    rows = np.zeros(num_systems, dtype=np.intp)
+    pivot_columns = np.full((num_systems, num_rows), -1, dtype=np.intp)
+    row_index = np.arange(num_rows)
+    for col in range(num_columns - 1):
+        active = np.flatnonzero(rows < num_rows)
+        if len(active) == 0:
+            break
+        ratios = np.abs(matrices[active, :, col]) / tol[active]
+        ratios[row_index[np.newaxis, :] < rows[active, np.newaxis]] = -1
+        pivot_rows = np.argmax(ratios, axis=1)
+        has_pivot = ratios[np.arange(len(active)), pivot_rows] > 1
+
+        skipped = active[~has_pivot]
+        if len(skipped):
+            below = row_index[np.newaxis, :] >= rows[skipped, np.newaxis]
+            matrices[skipped, :, col] *= ~below
+
+        systems = active[has_pivot]
+        if len(systems) == 0:
+            continue
+        current = rows[systems]
+        pivot_rows = pivot_rows[has_pivot]
+        pivot = matrices[systems, pivot_rows].copy()
+        matrices[systems, pivot_rows] = matrices[systems, current]
+        tol[systems, current], tol[systems, pivot_rows] = tol[systems, pivot_rows], tol[systems, current]
+        pivot /= pivot[:, col, np.newaxis]
+        matrices[systems, current] = pivot
+
+        factors = matrices[systems, :, col].copy()
+        factors[np.arange(len(systems)), current] = 0
+        matrices[systems] -= factors[:, :, np.newaxis] * pivot[:, np.newaxis, :]
+        matrices[systems, :, col] = 0
+        matrices[systems, current, col] = 1
+
+        pivot_columns[systems, current] = col
+        rows[systems] += 1
+    return pivot_columns
+
+
+def classify_batch(matrices, pivot_columns, tol):
+    num_systems, num_rows, num_columns = matrices.shape
+    rank = (pivot_columns >= 0).sum(axis=1)
+    beyond_rank = np.arange(num_rows)[np.newaxis, :] >= rank[:, np.newaxis]
+    inconsistent = (beyond_rank & (np.abs(matrices[:, :, -1]) > tol)).any(axis=1)
+
+    status = np.full(num_systems, UNIQUE_SOLUTION, dtype=np.int8)
+    status[rank < num_columns - 1] = INFINITE_SOLUTIONS
+    status[inconsistent] = NO_SOLUTION
+    return status
+
+
+def basepoints_batch(matrices, pivot_columns):
+    num_systems, num_rows, num_columns = matrices.shape
+    basepoints = np.zeros((num_systems, num_columns - 1))
+    systems, rows = np.nonzero(pivot_columns >= 0)
+    basepoints[systems, pivot_columns[systems, rows]] = matrices[systems, rows, -1]
+    return basepoints
+
+
+def lu_factor(matrix, tol=EPSILON):
+    # In-place LU with scaled partial pivoting (see reduce_row_echelon):
+    # afterwards the strict lower triangle holds L (unit diagonal implied)
+    # and the upper triangle holds U.
+    n = matrix.shape[0]
+    tol = _row_thresholds(tol, n)
+    tracking = instrument.enabled
+    if tracking:
+        initial = largest = _track_growth(matrix, 0.0)
+    permutation = np.arange(n)
+    for col in range(n):
+        if tracking:
+            instrument.count('pivot_searches')
+        ratios = np.abs(matrix[col:, col]) / tol[col:]
+        pivot_row = col + int(np.argmax(ratios))
+        if ratios[pivot_row - col] <= 1:
+            return None
+        if pivot_row != col:
+            matrix[[col, pivot_row]] = matrix[[pivot_row, col]]
+            tol[[col, pivot_row]] = tol[[pivot_row, col]]
+            permutation[[col, pivot_row]] = permutation[[pivot_row, col]]
+            if tracking:
+                instrument.count('row_swaps')
+        matrix[col + 1:, col] /= matrix[col, col]
+        matrix[col + 1:, col + 1:] -= np.outer(matrix[col + 1:, col], matrix[col, col + 1:])
+        if tracking:
+            instrument.count('row_additions', n - col - 1)
+            largest = _track_growth(matrix[col + 1:, col + 1:], largest)
+    if tracking and initial:
+        instrument.record_growth(largest / initial)
+    return permutation
+
+
+def _update_columns(matrix, start, end, first, last):
+    # Block row start:end of U for columns first:last (a forward
+    # substitution with the unit lower triangle of the panel), then the
+    # matching columns of the trailing matrix.
+    for i in range(start + 1, end):
+        matrix[i, first:last] -= matrix[i, start:i] @ matrix[start:i, first:last]
+    matrix[end:, first:last] -= matrix[end:, start:end] @ matrix[start:end, first:last]
+
+
+def lu_factor_blocked(matrix, tol=EPSILON, block_size=BLOCK_SIZE, threads=1):
+    # Right-looking blocked LU with the scaled partial pivoting and the
+    # layout of lu_factor, in place. Each panel of block_size columns is factored
+    # column by column, touching only the panel; the rest of the matrix is
+    # then updated once per panel with a matrix-matrix product instead of
+    # once per column with an outer product, so it streams through memory
+    # n / block_size times instead of n times. The trailing update is split
+    # into column tiles that run on `threads` threads (numpy releases the
+    # GIL in matmul). The first min(m, n) columns are pivoted, so an
+    # augmented n x (n + 1) matrix comes out as [U | L^-1 P b].
+    num_rows, num_columns = matrix.shape
+    steps = min(num_rows, num_columns)
+    tol = _row_thresholds(tol, num_rows)
+    tracking = instrument.enabled
+    if tracking:
+        initial = _track_growth(matrix, 0.0)
+    permutation = np.arange(num_rows)
+    pool = ThreadPoolExecutor(threads) if threads > 1 else None
+    try:
+        for start in range(0, steps, block_size):
+            end = min(start + block_size, steps)
+            for col in range(start, end):
+                if tracking:
+                    instrument.count('pivot_searches')
+                ratios = np.abs(matrix[col:, col]) / tol[col:]
+                pivot_row = col + int(np.argmax(ratios))
+                if ratios[pivot_row - col] <= 1:
+                    return None
+                if pivot_row != col:
+                    matrix[[col, pivot_row]] = matrix[[pivot_row, col]]
+                    tol[[col, pivot_row]] = tol[[pivot_row, col]]
+                    permutation[[col, pivot_row]] = permutation[[pivot_row, col]]
+                    if tracking:
+                        instrument.count('row_swaps')
+                matrix[col + 1:, col] /= matrix[col, col]
+                matrix[col + 1:, col + 1:end] -= np.outer(matrix[col + 1:, col], matrix[col, col + 1:end])
+                if tracking:
+                    instrument.count('row_additions', num_rows - col - 1)
+            if end == num_columns:
+                continue
+            if pool is None:
+                _update_columns(matrix, start, end, end, num_columns)
+            else:
+                bounds = np.linspace(end, num_columns, threads + 1).astype(int)
+                tiles = [pool.submit(_update_columns, matrix, start, end, first, last)
+                         for first, last in zip(bounds[:-1], bounds[1:]) if last > first]
+                for tile in tiles:
+                    tile.result()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if tracking and initial:
+        instrument.record_growth(_track_growth(np.triu(matrix), 0.0) / initial)
+    return permutation
+
+
+def lu_solve(lu, permutation, constant_terms):
+    # constant_terms is (n,) or (n, k); both substitutions work on all k
+    # right-hand sides at once.
+    n = lu.shape[0]
+    x = np.array(constant_terms, dtype=np.float64)[permutation]
+    with instrument.phase('forward_substitution'):
+        for i in range(1, n):
+            x[i] -= lu[i, :i] @ x[:i]
+    with instrument.phase('back_substitution'):
+        for i in range(n - 1, -1, -1):
+            x[i] -= lu[i, i + 1:] @ x[i + 1:]
+            x[i] /= lu[i, i]
+    return x
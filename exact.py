@@ -0,0 +1,100 @@
+import math
+from fractions import Fraction
+
+import elimination
+
+
+def integer_rows(planes):
+    # Every coefficient is converted to an exact Fraction (floats and
+    # Decimals keep their exact binary/decimal value), then each equation is
+    # scaled by the lcm of its denominators. Scaling a row does not change
+    # the solution set.
+    rows = []
+    for p in planes:
+        row = [Fraction(x) for x in p.normal_vector] + [Fraction(p.constant_term)]
+        scale = 1
+        for x in row:
+            scale = math.lcm(scale, x.denominator)
+        rows.append([int(x * scale) for x in row])
+    return rows
+
+
+def bareiss(rows):
+    # Fraction-free forward elimination. Every division is exact, and each
+    # entry stays a minor of the input, so integers grow only linearly in
+    # size instead of exponentially.
+    num_rows = len(rows)
+    num_variables = len(rows[0]) - 1 if rows else 0
+    previous = 1
+    pivot_columns = []
+    r = 0
+    for c in range(num_variables):
+        if r >= num_rows:
+            break
+        pivot_row = next((i for i in range(r, num_rows) if rows[i][c] != 0), None)
+        if pivot_row is None:
+            continue
+        if pivot_row != r:
+            rows[r], rows[pivot_row] = rows[pivot_row], rows[r]
+        pivot = rows[r]
+        p = pivot[c]
+        for i in range(r + 1, num_rows):
+            row = rows[i]
+            a = row[c]
+            rows[i] = [(p * x - a * y) // previous for x, y in zip(row, pivot)]
+        previous = p
+        pivot_columns.append(c)
+        r += 1
+    return pivot_columns
+
+
+def classify(rows, pivot_columns):
+    rank = len(pivot_columns)
+    if any(row[-1] != 0 for row in rows[rank:]):
+        return elimination.NO_SOLUTION
+    if rows and rank < len(rows[0]) - 1:
+        return elimination.INFINITE_SOLUTIONS
+    return elimination.UNIQUE_SOLUTION
+
+
+def back_substitute(rows, pivot_columns, free_column=None):
+    num_variables = len(rows[0]) - 1
+    x = [Fraction(0)] * num_variables
+    if free_column is not None:
+        x[free_column] = Fraction(1)
+    for k in range(len(pivot_columns) - 1, -1, -1):
+        c = pivot_columns[k]
+        row = rows[k]
+        total = 0 if free_column is not None else row[-1]
+        for j in range(c + 1, num_variables):
+            if row[j] and x[j]:
+                total -= row[j] * x[j]
+        x[c] = Fraction(total) / row[c]
+    return x
+
+
+def parametrize(rows, pivot_columns):
+    num_variables = len(rows[0]) - 1
+    pivots = set(pivot_columns)
+    basepoint = back_substitute(rows, pivot_columns)
+    direction_vectors = [back_substitute(rows, pivot_columns, c) for c in range(num_variables) if c not in pivots]
+    return basepoint, direction_vectors
+
+
+if __name__ == "__main__":
+    rows = [[0, 1, 1, 1], [1, -1, 1, 2], [1, 2, -5, 3]]
+    pivot_columns = bareiss(rows)
+    if not (classify(rows, pivot_columns) == elimination.UNIQUE_SOLUTION and
+                    back_substitute(rows, pivot_columns) == [Fraction(23, 9), Fraction(7, 9), Fraction(2, 9)]):
+        print('test case 1 failed')
+
+    rows = [[1, 1, 1, 1], [1, 1, 1, 2]]
+    if not classify(rows, bareiss(rows)) == elimination.NO_SOLUTION:
+        print('test case 2 failed')
+
+    rows = [[1, 1, 1, 1], [0, 1, 1, 2], [2, 3, 3, 4]]
+    pivot_columns = bareiss(rows)
+    basepoint, direction_vectors = parametrize(rows, pivot_columns)
+    if not (classify(rows, pivot_columns) == elimination.INFINITE_SOLUTIONS and
+                    basepoint == [-1, 2, 0] and direction_vectors == [[0, -1, 1]]):
+        print('test case 3 failed')
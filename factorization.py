@@ -0,0 +1,138 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from vector import Vector
+import elimination
+import instrument
+
+
+class LUFactorization(object):
+    NOT_SQUARE_MSG = 'LU factorization needs as many equations as unknowns'
+    SINGULAR_MATRIX_MSG = 'The coefficient matrix is singular'
+    WRONG_NUMBER_OF_CONSTANT_TERMS_MSG = 'Each right-hand side needs one constant term per equation'
+
+    def __init__(self, coefficients, block_size=None, threads=1):
+        # With a block_size the factorization uses the blocked kernel, which
+        # pays off from a few hundred unknowns up.
+        coefficients = np.array(coefficients, dtype=np.float64)
+        if coefficients.ndim != 2 or coefficients.shape[0] != coefficients.shape[1]:
+            raise Exception(self.NOT_SQUARE_MSG)
+        self.dimension = coefficients.shape[0]
+        with instrument.phase('forward_elimination'):
+            tol = elimination.row_tolerance(coefficients)
+            if block_size is None:
+                permutation = elimination.lu_factor(coefficients, tol)
+            else:
+                permutation = elimination.lu_factor_blocked(coefficients, tol, block_size, threads)
+        if permutation is None:
+            raise Exception(self.SINGULAR_MATRIX_MSG)
+        self.lu = coefficients
+        self.permutation = permutation
+
+    @classmethod
+    def from_system(cls, system):
+        return cls(system.to_matrix()[:, :-1])
+
+    def solve(self, constant_terms):
+        b = np.asarray(constant_terms, dtype=np.float64)
+        if b.shape[-1] != self.dimension:
+            raise Exception(self.WRONG_NUMBER_OF_CONSTANT_TERMS_MSG)
+        if b.ndim == 1:
+            return Vector(elimination.lu_solve(self.lu, self.permutation, b).tolist())
+        return elimination.lu_solve(self.lu, self.permutation, b.T).T
+
+    def solve_system(self, system):
+        return self.solve([p.constant_term for p in system.planes])
+
+
+class FactorizationCache(object):
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(coefficients):
+        coefficients = np.ascontiguousarray(coefficients, dtype=np.float64)
+        digest = hashlib.sha1(repr(coefficients.shape).encode())
+        digest.update(coefficients.tobytes())
+        return digest.hexdigest()
+
+    def get(self, system):
+        coefficients = system.to_matrix()[:, :-1]
+        key = self.key(coefficients)
+        factorization = self._entries.get(key)
+        if factorization is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return factorization
+
+        self.misses += 1
+        factorization = LUFactorization(coefficients)
+        self._entries[key] = factorization
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return factorization
+
+    def solve(self, system):
+        return self.get(system).solve_system(system)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+if __name__ == "__main__":
+    from plane import Plane
+    from linesys import LinearSystem
+
+    p1 = Plane(normal_vector=Vector([0, 1, 1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1, -1, 1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1, 2, -5]), constant_term=3)
+    s = LinearSystem([p1, p2, p3])
+    f = LUFactorization.from_system(s)
+    x = f.solve_system(s)
+    if not all(abs(a - b) < 1e-10 for a, b in zip(x, s.solve())):
+        print('test case 1 failed')
+
+    solutions = f.solve([[1, 2, 3], [0, 0, 0], [4, 5, 6]])
+    if not (solutions.shape == (3, 3) and
+                    Vector(solutions[0].tolist()) == x and
+                    not solutions[1].any()):
+        print('test case 2 failed')
+
+    cache = FactorizationCache(maxsize=1)
+    cache.solve(s)
+    cache.solve(LinearSystem([Plane(normal_vector=Vector([0, 1, 1]), constant_term=7), p2, p3]))
+    if not (cache.hits == 1 and cache.misses == 1):
+        print('test case 3 failed')
+
+    cache.solve(LinearSystem([p2, p1, p3]))
+    cache.solve(s)
+    if not (cache.misses == 3 and len(cache) == 1):
+        print('test case 4 failed')
+
+    try:
+        LUFactorization([[1, 1], [2, 2]])
+        print('test case 5 failed')
+    except Exception as e:
+        if str(e) != LUFactorization.SINGULAR_MATRIX_MSG:
+            print('test case 5 failed')
+
+    blocked = LUFactorization.from_system(s).lu, LUFactorization(s.to_matrix()[:, :-1], block_size=2, threads=2).lu
+    if not np.allclose(*blocked):
+        print('test case 6 failed')
+    try:
+        LUFactorization([[1, 1], [2, 2]], block_size=1)
+        print('test case 7 failed')
+    except Exception as e:
+        if str(e) != LUFactorization.SINGULAR_MATRIX_MSG:
+            print('test case 7 failed')
@@ -0,0 +1,222 @@
+import numpy as np
+
+from vector import Vector
+from linesys import LinearSystem
+import elimination
+
+
+class IncrementalLinearSystem(object):
+    # Keeps the reduced row echelon form R of the augmented matrix M alive
+    # across edits, together with the transform T for which R = T M. Rows of
+    # R are kept in no particular order; pivots[i] is the column of row i's
+    # leading 1, or -1 for a row whose coefficients are all zero.
+    #
+    # Adding a plane reduces it against the existing pivots and, if it brings
+    # a new pivot, clears that column from every other row: a rank-one update
+    # of R and T. Removing plane k picks a row p of R that depends on it,
+    # eliminates column k of T from every other row with row p (again a
+    # rank-one update) and then drops row p, so both cost O(m (m + n)).
+    ALL_PLANES_MUST_BE_IN_SAME_DIM_MSG = LinearSystem.ALL_PLANES_MUST_BE_IN_SAME_DIM_MSG
+    NO_SOLUTIONS_MSG = LinearSystem.NO_SOLUTIONS_MSG
+    DIMENSION_REQUIRED_MSG = 'An empty system needs an explicit dimension'
+
+    # Rounding errors build up in R and T over many edits, so the reduced
+    # form is rebuilt from the planes after this many of them.
+    REFRESH_INTERVAL = 256
+
+    def __init__(self, planes=(), dimension=None):
+        planes = list(planes)
+        if dimension is None:
+            if not planes:
+                raise Exception(self.DIMENSION_REQUIRED_MSG)
+            dimension = planes[0].dimension
+        self.dimension = dimension
+        self.refresh(planes)
+
+    @classmethod
+    def from_system(cls, system):
+        return cls(system.planes, system.dimension)
+
+    def refresh(self, planes=None):
+        if planes is None:
+            planes = self.planes
+        self.planes = []
+        self.reduced = np.zeros((0, self.dimension + 1))
+        self.transform = np.zeros((0, 0))
+        self.pivots = np.zeros(0, dtype=np.intp)
+        self.tolerances = np.zeros(0)
+        for p in planes:
+            self._insert(len(self.planes), p)
+        self._edits = 0
+
+    def _edited(self):
+        self._edits += 1
+        if self._edits >= self.REFRESH_INTERVAL:
+            self.refresh()
+
+    def _insert(self, index, plane):
+        if plane.dimension != self.dimension:
+            raise Exception(self.ALL_PLANES_MUST_BE_IN_SAME_DIM_MSG)
+        row = np.array(plane.normal_vector.coordinates + (plane.constant_term,), dtype=np.float64)
+        # Each row of R keeps the threshold of the plane it was added for.
+        tol = float(elimination.row_tolerance(row))
+
+        num_rows = len(self.planes)
+        self.planes.insert(index, plane)
+        self.transform = np.insert(self.transform, index, 0.0, axis=1)
+        t = np.zeros(num_rows + 1)
+        t[index] = 1.0
+
+        pivot_rows = np.flatnonzero(self.pivots >= 0)
+        if len(pivot_rows):
+            factors = row[self.pivots[pivot_rows]].copy()
+            row -= factors @ self.reduced[pivot_rows]
+            t -= factors @ self.transform[pivot_rows]
+            row[self.pivots[pivot_rows]] = 0
+
+        col = int(np.argmax(np.abs(row[:-1])))
+        if abs(row[col]) > tol:
+            pivot = row[col]
+            row /= pivot
+            t /= pivot
+            factors = self.reduced[:, col].copy()
+            self.reduced -= np.outer(factors, row)
+            self.transform -= np.outer(factors, t)
+            self.reduced[:, col] = 0
+            row[col] = 1
+        else:
+            row[:-1] = 0
+            col = -1
+
+        self.reduced = np.vstack([self.reduced, row])
+        self.transform = np.vstack([self.transform, t])
+        self.pivots = np.append(self.pivots, col)
+        self.tolerances = np.append(self.tolerances, tol)
+
+    def add_plane(self, plane, index=None):
+        self._insert(len(self.planes) if index is None else index, plane)
+        self._edited()
+
+    def remove_plane(self, index):
+        # Prefer a zero row of R that uses plane `index`: such a row is a
+        # dependency among the planes, so dropping it keeps the rank. Only
+        # when no dependency involves the plane does a pivot row go, and the
+        # rank drops by one.
+        column = self.transform[:, index]
+        magnitudes = np.abs(column)
+        limit = elimination.EPSILON * magnitudes.max()
+        zero_rows = self.pivots < 0
+        candidates = np.where(zero_rows & (magnitudes > limit), magnitudes, -1)
+        if candidates.max() > 0:
+            p = int(np.argmax(candidates))
+        else:
+            p = int(np.argmax(magnitudes))
+
+        factors = column / column[p]
+        factors[p] = 0
+        if not zero_rows[p]:
+            factors[zero_rows] = 0
+        self.reduced -= np.outer(factors, self.reduced[p])
+        self.transform -= np.outer(factors, self.transform[p])
+
+        self.reduced = np.delete(self.reduced, p, axis=0)
+        self.transform = np.delete(np.delete(self.transform, p, axis=0), index, axis=1)
+        self.pivots = np.delete(self.pivots, p)
+        self.tolerances = np.delete(self.tolerances, p)
+        del self.planes[index]
+        self._edited()
+
+    def replace_plane(self, index, plane):
+        self.remove_plane(index)
+        self.add_plane(plane, index)
+
+    def rank(self):
+        return int((self.pivots >= 0).sum())
+
+    def status(self):
+        zero_rows = self.pivots < 0
+        if np.any(np.abs(self.reduced[zero_rows, -1]) > self.tolerances[zero_rows]):
+            return elimination.NO_SOLUTION
+        if self.rank() < self.dimension:
+            return elimination.INFINITE_SOLUTIONS
+        return elimination.UNIQUE_SOLUTION
+
+    def solve(self):
+        pivot_rows = np.flatnonzero(self.pivots >= 0)
+        pivot_rows = pivot_rows[np.argsort(self.pivots[pivot_rows])]
+        order = np.concatenate([pivot_rows, np.flatnonzero(self.pivots < 0)])
+        return LinearSystem.solution_from_rref(self.reduced[order], self.pivots[pivot_rows].tolist(),
+                                               self.tolerances[order])
+
+    def to_system(self):
+        return LinearSystem(list(self.planes))
+
+    def to_matrix(self):
+        return elimination.augmented_matrix(self.planes)
+
+    def __len__(self):
+        return len(self.planes)
+
+    def __getitem__(self, i):
+        return self.planes[i]
+
+    def __setitem__(self, i, x):
+        self.replace_plane(i, x)
+
+
+if __name__ == "__main__":
+    from plane import Plane
+    from linesys import Parametrization
+
+    p1 = Plane(normal_vector=Vector([1, 1, 1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([0, 1, 1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1, 2, 2]), constant_term=3)
+    p4 = Plane(normal_vector=Vector([1, 2, 3]), constant_term=4)
+    s = IncrementalLinearSystem([p1, p2])
+    if not (s.status() == elimination.INFINITE_SOLUTIONS and isinstance(s.solve(), Parametrization)):
+        print('test case 1 failed')
+
+    s.add_plane(p3)
+    if not (s.rank() == 2 and s.status() == elimination.INFINITE_SOLUTIONS):
+        print('test case 2 failed')
+
+    s.add_plane(p4)
+    if not (s.status() == elimination.UNIQUE_SOLUTION and s.solve() == LinearSystem([p1, p2, p3, p4]).solve()):
+        print('test case 3 failed')
+
+    # p3 = p1 + p2 is the dependency, so removing p2 keeps a unique solution.
+    s.remove_plane(1)
+    if not (s.rank() == 3 and s.solve() == LinearSystem([p1, p3, p4]).solve()):
+        print('test case 4 failed')
+
+    s[1] = Plane(normal_vector=Vector([1, 1, 1]), constant_term=2)
+    if not (s.status() == elimination.NO_SOLUTION and s.rank() == 2):
+        print('test case 5 failed')
+    try:
+        s.solve()
+        print('test case 5 failed')
+    except Exception as e:
+        if str(e) != IncrementalLinearSystem.NO_SOLUTIONS_MSG:
+            print('test case 5 failed')
+
+    s.remove_plane(0)
+    if not (s.status() == elimination.INFINITE_SOLUTIONS and [p.constant_term for p in s] == [2, 4]):
+        print('test case 6 failed')
+
+    rng = np.random.default_rng(0)
+    n = 60
+    matrix = rng.normal(size=(n, n + 1))
+    s = IncrementalLinearSystem(LinearSystem.from_matrix(matrix).planes)
+    for _ in range(300):
+        i = int(rng.integers(n))
+        s.replace_plane(i, Plane(Vector(rng.normal(size=n).tolist()), float(rng.normal())))
+    expected = s.to_system().solve()
+    if not all(abs(a - b) < 1e-6 for a, b in zip(s.solve(), expected)):
+        print('test case 7 failed')
+
+    scaled = IncrementalLinearSystem([Plane(normal_vector=Vector([1e6, 0, 0]), constant_term=1),
+                                      Plane(normal_vector=Vector([0, 1e-6, 0]), constant_term=1),
+                                      Plane(normal_vector=Vector([0, 0, 1]), constant_term=1)])
+    if not (scaled.status() == elimination.UNIQUE_SOLUTION and
+                    np.allclose(scaled.solve().coordinates, [1e-6, 1e6, 1], rtol=1e-12, atol=0)):
+        print('test case 8 failed')
@@ -0,0 +1,124 @@
+import contextvars
+import threading
+import time
+
+# Hot paths test this flag before doing anything else, so instrumentation
+# costs one module attribute lookup while no collector is active.
+enabled = False
+
+# Collectors may open and close on several threads at once; _active and
+# enabled only change together, under this lock.
+_active = 0
+_active_lock = threading.Lock()
+_current = contextvars.ContextVar('solve_stats', default=None)
+_exporters = []
+
+
+class SolveStats(object):
+    COUNTERS = ('row_swaps', 'row_scalings', 'row_additions', 'pivot_searches', 'planes_created', 'vectors_created')
+
+    def __init__(self):
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.phase_seconds = {}
+        self.max_pivot_growth = 1.0
+
+    def record_growth(self, growth):
+        if growth > self.max_pivot_growth:
+            self.max_pivot_growth = growth
+
+    def as_dict(self):
+        result = {name: getattr(self, name) for name in self.COUNTERS}
+        result['phase_seconds'] = dict(self.phase_seconds)
+        result['max_pivot_growth'] = self.max_pivot_growth
+        return result
+
+    def __str__(self):
+        return 'SolveStats: {}'.format(self.as_dict())
+
+
+class _Collect(object):
+
+    def __enter__(self):
+        global enabled, _active
+        self.stats = SolveStats()
+        self._token = _current.set(self.stats)
+        with _active_lock:
+            _active += 1
+            enabled = True
+        return self.stats
+
+    def __exit__(self, exc_type, exc, tb):
+        global enabled, _active
+        _current.reset(self._token)
+        with _active_lock:
+            _active -= 1
+            enabled = _active > 0
+        for exporter in list(_exporters):
+            exporter(self.stats)
+        return False
+
+
+class _Phase(object):
+    __slots__ = ('stats', 'name', 'start')
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = self.stats.phase_seconds
+        seconds[self.name] = seconds.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+class _NoPhase(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+
+def collect():
+    return _Collect()
+
+
+def current():
+    return _current.get() if enabled else None
+
+
+def count(name, amount=1):
+    stats = _current.get()
+    if stats is not None:
+        setattr(stats, name, getattr(stats, name) + amount)
+
+
+def phase(name):
+    stats = _current.get() if enabled else None
+    if stats is None:
+        return _NO_PHASE
+    return _Phase(stats, name)
+
+
+def record_growth(growth):
+    stats = _current.get()
+    if stats is not None:
+        stats.record_growth(growth)
+
+
+def add_exporter(exporter):
+    _exporters.append(exporter)
+
+
+def remove_exporter(exporter):
+    _exporters.remove(exporter)
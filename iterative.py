@@ -0,0 +1,179 @@
+import numpy as np
+
+from vector import Vector
+from linesys import LinearSystem, MatrixLinearSystem
+
+
+class IterativeResult(object):
+
+    def __init__(self, solution, method, iterations, residual_history, converged):
+        self.solution = solution
+        self.method = method
+        self.iterations = iterations
+        self.residual_history = residual_history
+        self.converged = converged
+
+    def __str__(self):
+        return 'IterativeResult: {} after {} iterations, residual {}, converged {}'.format(
+            self.method, self.iterations, self.residual_history[-1] if self.residual_history else None, self.converged)
+
+
+class IterativeSolver(object):
+    NEEDS_SQUARE_SYSTEM_MSG = 'Iterative methods need as many equations as unknowns'
+    WRONG_INITIAL_GUESS_MSG = 'The initial guess must have one coordinate per unknown'
+
+    # A run is abandoned when the residual becomes non-finite, grows by
+    # DIVERGENCE_FACTOR over the starting residual, or fails to improve on
+    # its best value by STAGNATION_RATIO within STAGNATION_WINDOW steps.
+    DIVERGENCE_FACTOR = 1e6
+    STAGNATION_WINDOW = 50
+    STAGNATION_RATIO = 0.99
+
+    def __init__(self, tol=1e-10, max_iterations=1000, fallback=True):
+        self.tol = tol
+        self.max_iterations = max_iterations
+        self.fallback = fallback
+
+    def _arrays(self, system):
+        matrix = system.to_matrix() if isinstance(system, LinearSystem) else np.asarray(system, dtype=np.float64)
+        return matrix[:, :-1], matrix[:, -1]
+
+    def _initial(self, initial_guess, n):
+        if initial_guess is None:
+            return np.zeros(n)
+        x = np.array(initial_guess.coordinates if isinstance(initial_guess, Vector) else initial_guess, dtype=np.float64)
+        if x.shape != (n,):
+            raise Exception(self.WRONG_INITIAL_GUESS_MSG)
+        return x
+
+    def _residual(self, A, b, x, scale):
+        return float(np.linalg.norm(b - A @ x)) / scale
+
+    def _failing(self, history, best_at):
+        last = history[-1]
+        if not np.isfinite(last) or last > self.DIVERGENCE_FACTOR * max(history[0], self.tol):
+            return True
+        return len(history) - 1 - best_at >= self.STAGNATION_WINDOW
+
+    def solve(self, system, method='conjugate_gradient', initial_guess=None):
+        A, b = self._arrays(system)
+        steps = {
+            'jacobi': self._jacobi,
+            'gauss_seidel': self._gauss_seidel,
+            'conjugate_gradient': self._conjugate_gradient,
+        }[method]
+
+        history = []
+        iterations = 0
+        if A.shape[0] == A.shape[1]:
+            scale = float(np.linalg.norm(b)) or 1.0
+            x = self._initial(initial_guess, A.shape[1])
+            history.append(self._residual(A, b, x, scale))
+            best, best_at = history[0], 0
+            if history[0] <= self.tol:
+                return IterativeResult(Vector(x.tolist()), method, 0, history, True)
+
+            for x, residual in steps(A, b, x, scale):
+                iterations += 1
+                history.append(residual)
+                if residual < best * self.STAGNATION_RATIO:
+                    best, best_at = residual, len(history) - 1
+                if residual <= self.tol:
+                    return IterativeResult(Vector(x.tolist()), method, iterations, history, True)
+                if iterations >= self.max_iterations or self._failing(history, best_at):
+                    break
+            else:
+                x = None
+        elif not self.fallback:
+            raise Exception(self.NEEDS_SQUARE_SYSTEM_MSG)
+        else:
+            x = None
+
+        if not self.fallback:
+            return IterativeResult(Vector(x.tolist()) if x is not None else None, method, iterations, history, False)
+        solution = MatrixLinearSystem(np.column_stack([A, b])).solve()
+        return IterativeResult(solution, 'direct', iterations, history, True)
+
+    def _jacobi(self, A, b, x, scale):
+        diagonal = np.diag(A).copy()
+        if not diagonal.all():
+            return
+        remainder = A - np.diag(diagonal)
+        while True:
+            x = (b - remainder @ x) / diagonal
+            yield x, self._residual(A, b, x, scale)
+
+    def _gauss_seidel(self, A, b, x, scale):
+        n = len(b)
+        if not np.diag(A).all():
+            return
+        x = x.copy()
+        while True:
+            for i in range(n):
+                x[i] = (b[i] - A[i, :i] @ x[:i] - A[i, i + 1:] @ x[i + 1:]) / A[i, i]
+            yield x, self._residual(A, b, x, scale)
+
+    def _conjugate_gradient(self, A, b, x, scale):
+        # Only meaningful for symmetric positive definite systems; on anything
+        # else the divergence and stagnation checks send it to the fallback.
+        r = b - A @ x
+        p = r.copy()
+        rr = r @ r
+        while True:
+            Ap = A @ p
+            curvature = p @ Ap
+            if curvature <= 0:
+                return
+            alpha = rr / curvature
+            x = x + alpha * p
+            r = r - alpha * Ap
+            rr_next = r @ r
+            p = r + (rr_next / rr) * p
+            rr = rr_next
+            yield x, float(np.sqrt(rr)) / scale
+
+
+def jacobi(system, initial_guess=None, tol=1e-10, max_iterations=1000, fallback=True):
+    return IterativeSolver(tol, max_iterations, fallback).solve(system, 'jacobi', initial_guess)
+
+
+def gauss_seidel(system, initial_guess=None, tol=1e-10, max_iterations=1000, fallback=True):
+    return IterativeSolver(tol, max_iterations, fallback).solve(system, 'gauss_seidel', initial_guess)
+
+
+def conjugate_gradient(system, initial_guess=None, tol=1e-10, max_iterations=1000, fallback=True):
+    return IterativeSolver(tol, max_iterations, fallback).solve(system, 'conjugate_gradient', initial_guess)
+
+
+if __name__ == "__main__":
+    from plane import Plane
+
+    p1 = Plane(normal_vector=Vector([4, -1, 0]), constant_term=2)
+    p2 = Plane(normal_vector=Vector([-1, 4, -1]), constant_term=4)
+    p3 = Plane(normal_vector=Vector([0, -1, 4]), constant_term=10)
+    s = LinearSystem([p1, p2, p3])
+    direct = s.solve()
+
+    for solve in (jacobi, gauss_seidel, conjugate_gradient):
+        result = solve(s)
+        if not (result.converged and result.method == solve.__name__ and
+                        all(abs(a - b) < 1e-9 for a, b in zip(result.solution, direct))):
+            print('test case 1 failed for {}'.format(solve.__name__))
+
+    cold = gauss_seidel(s)
+    warm = gauss_seidel(s, initial_guess=Vector([c + 1e-6 for c in direct]))
+    if not (warm.converged and warm.iterations < cold.iterations and
+                    warm.residual_history[0] < cold.residual_history[0]):
+        print('test case 2 failed')
+
+    # Not diagonally dominant: Jacobi diverges and the direct path takes over.
+    p1 = Plane(normal_vector=Vector([1, 3]), constant_term=4)
+    p2 = Plane(normal_vector=Vector([3, 1]), constant_term=4)
+    s = LinearSystem([p1, p2])
+    result = jacobi(s)
+    if not (result.method == 'direct' and result.converged and result.solution == s.solve()):
+        print('test case 3 failed')
+
+    result = jacobi(s, fallback=False)
+    if not (not result.converged and result.method == 'jacobi' and result.iterations < 1000):
+        print('test case 4 failed')
@@ -0,0 +1,325 @@
+import math
+
+import numpy as np
+
+from vector import Vector
+from vectorbatch import VectorBatch, round_like_python, sequential_sum
+
+# Lazy Vector arithmetic. Operations only record an expression tree; reading
+# the result evaluates it. Equal subexpressions (the normalized basis that
+# component_orthogonal_to reads twice, say) are evaluated once, and a chain
+# like v.minus(b.times_scalar(c)).plus(w) works on plain lists, creating a
+# single Vector for the result instead of one per step. Each operation
+# rounds exactly like its eager Vector counterpart, so the results are
+# identical.
+#
+# Leaves that are VectorBatches (or (N, d) arrays) evaluate with numpy,
+# updating intermediate arrays in place where they are not shared.
+
+DIMENSIONS_MUST_MATCH_MSG = VectorBatch.DIMENSIONS_MUST_MATCH_MSG
+
+
+def lazy(v):
+    return v if isinstance(v, Expression) else Leaf(v)
+
+
+def _scalar(c):
+    return c if isinstance(c, ScalarExpression) else Constant(c)
+
+
+class Expression(object):
+
+    def plus(self, v):
+        return Operation('plus', (self, lazy(v)))
+
+    def minus(self, v):
+        return Operation('minus', (self, lazy(v)))
+
+    def times_scalar(self, c):
+        return Operation('times_scalar', (_scalar(c), self))
+
+    def normalized(self):
+        return Operation('normalized', (InverseMagnitude(self, Vector.CANNOT_NORMALIZE_ZERO_VECTOR_MSG), self))
+
+    def magnitude(self):
+        return ScalarExpression('magnitude', (self,))
+
+    def dot(self, v):
+        return ScalarExpression('dot', (self, lazy(v)))
+
+    def component_parallel_to(self, basis):
+        basis = lazy(basis)
+        ub = Operation('normalized', (InverseMagnitude(basis, Vector.NO_UNIQUE_PARALLEL_COMPONENT_MSG), basis))
+        return ub.times_scalar(self.dot(ub))
+
+    def component_orthogonal_to(self, basis):
+        return self.minus(self.component_parallel_to(basis))
+
+    def evaluate(self):
+        return _Evaluation(self).vector()
+
+
+class Leaf(Expression):
+
+    def __init__(self, value):
+        self.value = value
+
+    def evaluate(self):
+        return self.value
+
+
+class Operation(Expression):
+
+    def __init__(self, op, operands):
+        self.op = op
+        self.operands = operands
+
+
+class ScalarExpression(object):
+
+    def __init__(self, op, operands):
+        self.op = op
+        self.operands = operands
+
+    def evaluate(self):
+        return _Evaluation(self).scalar()
+
+
+class InverseMagnitude(ScalarExpression):
+
+    def __init__(self, operand, zero_msg):
+        ScalarExpression.__init__(self, 'inverse_magnitude', (operand,))
+        self.zero_msg = zero_msg
+
+
+class Constant(ScalarExpression):
+
+    def __init__(self, value):
+        self.value = value
+
+
+class _Evaluation(object):
+
+    def __init__(self, root):
+        self.leaves = []
+        self.constants = []
+        self._leaf_index = {}
+        self._constant_index = {}
+        self._signatures = {}
+        self._visits = []
+        self.batched = False
+        self.signature = self._sign(root)
+
+    def _sign(self, node):
+        # The signature is the tree with leaves and constants replaced by
+        # their order of first appearance: equal subexpressions get equal
+        # signatures, which is what both paths deduplicate on.
+        signature = self._signatures.get(id(node))
+        if signature is None:
+            if isinstance(node, Leaf):
+                signature = ('leaf', self._leaf(node.value))
+            elif isinstance(node, Constant):
+                index = self._constant_index.get(id(node.value))
+                if index is None:
+                    index = self._constant_index[id(node.value)] = len(self.constants)
+                    self.constants.append(node.value)
+                signature = ('constant', index)
+            elif isinstance(node, InverseMagnitude):
+                signature = (node.op, node.zero_msg, self._sign(node.operands[0]))
+            else:
+                signature = (node.op,) + tuple(self._sign(o) for o in node.operands)
+            self._signatures[id(node)] = signature
+        self._visits.append(signature)
+        return signature
+
+    def _leaf(self, value):
+        index = self._leaf_index.get(id(value))
+        if index is None:
+            if isinstance(value, VectorBatch):
+                coordinates = value.coordinates
+            elif isinstance(value, np.ndarray):
+                coordinates = np.asarray(value, dtype=np.float64)
+            else:
+                coordinates = value.coordinates
+            if isinstance(coordinates, np.ndarray):
+                dimension = coordinates.shape[-1]
+                self.batched = self.batched or coordinates.ndim == 2
+            else:
+                dimension = len(coordinates)
+            if self.leaves and dimension != self.dimension:
+                raise Exception(DIMENSIONS_MUST_MATCH_MSG)
+            self.dimension = dimension
+            index = self._leaf_index[id(value)] = len(self.leaves)
+            self.leaves.append(coordinates)
+        return index
+
+    def _count_uses(self):
+        self.values = {}
+        self.uses = {}
+        for signature in self._visits:
+            self.uses[signature] = self.uses.get(signature, 0) + 1
+
+    def vector(self):
+        self._count_uses()
+        if self.batched:
+            result, _ = self._array(self.signature)
+            return VectorBatch(result) if result.ndim == 2 else Vector(result.tolist())
+        return Vector(self._list(self.signature))
+
+    def scalar(self):
+        self._count_uses()
+        if self.batched:
+            return self._array_scalar(self.signature)
+        return self._list_scalar(self.signature)
+
+    # Lists for single Vectors, with the expressions Vector itself uses.
+
+    def _list(self, s):
+        if s[0] == 'leaf':
+            return self.leaves[s[1]]
+        cached = self.values.get(s)
+        if cached is not None:
+            return cached
+        if s[0] == 'plus':
+            result = [x + y for x, y in zip(self._list(s[1]), self._list(s[2]))]
+        elif s[0] == 'minus':
+            result = [x - y for x, y in zip(self._list(s[1]), self._list(s[2]))]
+        else:
+            c = self._list_scalar(s[1])
+            result = [c * x for x in self._list(s[2])]
+        if self.uses[s] > 1:
+            self.values[s] = result
+        return result
+
+    def _list_scalar(self, s):
+        if s[0] == 'constant':
+            return self.constants[s[1]]
+        cached = self.values.get(s)
+        if cached is not None:
+            return cached
+        if s[0] == 'magnitude':
+            value = math.sqrt(sum([x * x for x in self._list(s[1])]))
+        elif s[0] == 'dot':
+            value = round(sum([x * y for x, y in zip(self._list(s[1]), self._list(s[2]))]), 10)
+        else:
+            magnitude = self._list_scalar(('magnitude', s[2]))
+            if magnitude == 0:
+                raise Exception(s[1])
+            value = 1 / magnitude
+        self.values[s] = value
+        return value
+
+    # numpy path for batches.
+
+    def _array(self, s):
+        # Returns (array, owned): owned arrays are fresh and used only once,
+        # so the caller may update them in place.
+        if s[0] == 'leaf':
+            return np.asarray(self.leaves[s[1]], dtype=np.float64), False
+        cached = self.values.get(s)
+        if cached is not None:
+            return cached, False
+        if s[0] in ('plus', 'minus'):
+            x, x_owned = self._array(s[1])
+            y, y_owned = self._array(s[2])
+            ufunc = np.add if s[0] == 'plus' else np.subtract
+            shape = np.broadcast_shapes(x.shape, y.shape)
+            if x_owned and x.shape == shape:
+                result = ufunc(x, y, out=x)
+            elif y_owned and y.shape == shape:
+                result = ufunc(x, y, out=y)
+            else:
+                result = ufunc(x, y)
+        else:
+            c = self._array_scalar(s[1])
+            c = c[:, np.newaxis] if np.ndim(c) == 1 else c
+            x, owned = self._array(s[2])
+            if owned and x.shape == np.broadcast_shapes(x.shape, np.shape(c)):
+                result = np.multiply(c, x, out=x)
+            else:
+                result = np.multiply(c, x)
+        if self.uses[s] > 1:
+            self.values[s] = result
+            return result, False
+        return result, True
+
+    def _array_scalar(self, s):
+        if s[0] == 'constant':
+            return np.asarray(self.constants[s[1]], dtype=np.float64)
+        cached = self.values.get(s)
+        if cached is not None:
+            return cached
+        if s[0] == 'magnitude':
+            x, _ = self._array(s[1])
+            value = np.sqrt(sequential_sum(x * x))
+        elif s[0] == 'dot':
+            x, _ = self._array(s[1])
+            y, _ = self._array(s[2])
+            value = round_like_python(sequential_sum(x * y), 10)
+        else:
+            magnitude = self._array_scalar(('magnitude', s[2]))
+            if not np.all(magnitude):
+                raise Exception(s[1])
+            value = 1 / magnitude
+        self.values[s] = value
+        return value
+
+
+if __name__ == "__main__":
+    import timeit
+
+    v = Vector([3.039, 1.879])
+    b = Vector([0.825, 2.036])
+    w = Vector([-1.129, 2.111])
+    c = 7.41
+
+    if not lazy(v).minus(lazy(b).times_scalar(c)).plus(w).evaluate() == v.minus(b.times_scalar(c)).plus(w):
+        print('test case 1 failed')
+
+    eager = v.component_orthogonal_to(b).component_parallel_to(w).normalized()
+    if not lazy(v).component_orthogonal_to(b).component_parallel_to(w).normalized().evaluate() == eager:
+        print('test case 2 failed')
+
+    if not (lazy(v).plus(w).magnitude().evaluate() == v.plus(w).magnitude() and
+                    lazy(v).normalized().dot(w).evaluate() == v.normalized().dot(w)):
+        print('test case 3 failed')
+
+    try:
+        lazy(v).component_parallel_to(Vector([0, 0])).evaluate()
+        print('test case 4 failed')
+    except Exception as e:
+        if str(e) != Vector.NO_UNIQUE_PARALLEL_COMPONENT_MSG:
+            print('test case 4 failed')
+
+    rng = np.random.default_rng(0)
+    vs = VectorBatch(rng.normal(size=(100000, 3)))
+    bs = VectorBatch(rng.normal(size=(100000, 3)))
+    ws = VectorBatch(rng.normal(size=(100000, 3)))
+
+    def eager_chain():
+        return vs.minus(bs.times_scalar(c)).plus(ws).minus(bs.times_scalar(vs.dot(bs.normalized())))
+
+    def lazy_chain():
+        lb = lazy(bs)
+        return lazy(vs).minus(lb.times_scalar(c)).plus(ws).minus(lb.times_scalar(lazy(vs).dot(lb.normalized()))).evaluate()
+
+    if not lazy_chain() == eager_chain():
+        print('test case 5 failed')
+
+    import instrument
+    x, y, z = (Vector(rng.normal(size=1000).tolist()) for _ in range(3))
+    with instrument.collect() as eager_stats:
+        eager = x.minus(y.times_scalar(c)).plus(z).component_orthogonal_to(y).normalized()
+    with instrument.collect() as lazy_stats:
+        fused = lazy(x).minus(lazy(y).times_scalar(c)).plus(z).component_orthogonal_to(y).normalized().evaluate()
+    if not (fused == eager and lazy_stats.vectors_created == 1 and eager_stats.vectors_created > 1):
+        print('test case 6 failed')
+
+    print('chain over 1000-d Vectors: eager {:.2f} ms, lazy {:.2f} ms'.format(
+        1000 * min(timeit.repeat(lambda: Vector(x.coordinates).minus(y.times_scalar(c)).plus(z).component_orthogonal_to(
+            Vector(y.coordinates)).normalized(), number=20, repeat=5)) / 20,
+        1000 * min(timeit.repeat(lambda: lazy(x).minus(lazy(y).times_scalar(c)).plus(z).component_orthogonal_to(
+            Vector(y.coordinates)).normalized().evaluate(), number=20, repeat=5)) / 20))
+    print('chain over a 100000-vector batch: eager {:.1f} ms, lazy {:.1f} ms'.format(
+        1000 * min(timeit.repeat(eager_chain, number=1, repeat=5)),
+        1000 * min(timeit.repeat(lazy_chain, number=1, repeat=5))))
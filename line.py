@@ -1,8 +1,4 @@
-from decimal import Decimal, getcontext
-
-from vector import Vector
-
-getcontext().prec = 10
+from vector import Vector, is_near_zero
 
 
 class Line(object):
@@ -21,7 +17,14 @@ class Line(object):
             constant_term = 0
         self.constant_term = constant_term
 
-        self.set_basepoint()
+        self._basepoint = None
+        self._basepoint_computed = False
+
+    @property
+    def basepoint(self):
+        if not self._basepoint_computed:
+            self.set_basepoint()
+        return self._basepoint
 
     def is_parallel(self, l):
         return self.normal_vector.is_parallel(l.normal_vector)
@@ -51,16 +54,16 @@ class Line(object):
             initial_coefficient = n[initial_index]
 
             basepoint_coords[initial_index] = c/initial_coefficient
-            print("initial_coefficient : ", initial_coefficient)
-            print("base coords : ", basepoint_coords[initial_index])
-            self.basepoint = Vector(basepoint_coords)
+            self._basepoint = Vector(basepoint_coords)
 
         except Exception as e:
             if str(e) == Line.NO_NONZERO_ELTS_FOUND_MSG:
-                self.basepoint = None
+                self._basepoint = None
             else:
                 raise e
 
+        self._basepoint_computed = True
+
     def __eq__(self, other):
         if self.normal_vector.magnitude() == 0:
             return other.normal_vector.magnitude() == 0
@@ -120,17 +123,12 @@ class Line(object):
     @staticmethod
     def first_nonzero_index(iterable):
         for k, item in enumerate(iterable):
-            if not MyDecimal(item).is_near_zero():
+            if not is_near_zero(item):
                 return k
         raise Exception(Line.NO_NONZERO_ELTS_FOUND_MSG)
 
 
-class MyDecimal(Decimal):
-    def is_near_zero(self, eps=1e-10):
-        return abs(self) < eps
-
 if __name__ == "__main__":
-    print(getcontext().prec)
     # Quiz 1
     l1 = Line(Vector([4.046, 2.836]), 1.21)
     l2 = Line(Vector([10.115, 7.09]), 3.025)
@@ -0,0 +1,124 @@
+import numpy as np
+
+from vector import Vector
+from line import Line
+import elimination
+
+
+class LineBatch(object):
+    INTERSECTING = 0
+    PARALLEL = 1
+    COINCIDENT = 2
+
+    NORMALS_MUST_BE_TWO_DIMENSIONAL_MSG = 'The normal vectors must form an (N, 2) array'
+    WRONG_NUMBER_OF_CONSTANT_TERMS_MSG = 'The batch needs one constant term per line'
+
+    def __init__(self, normal_vectors, constant_terms, eps=elimination.EPSILON):
+        normal_vectors = np.ascontiguousarray(normal_vectors, dtype=np.float64)
+        constant_terms = np.ascontiguousarray(constant_terms, dtype=np.float64)
+        if normal_vectors.ndim != 2 or normal_vectors.shape[1] != 2:
+            raise ValueError(self.NORMALS_MUST_BE_TWO_DIMENSIONAL_MSG)
+        if constant_terms.shape != (normal_vectors.shape[0],):
+            raise ValueError(self.WRONG_NUMBER_OF_CONSTANT_TERMS_MSG)
+        self.normal_vectors = normal_vectors
+        self.constant_terms = constant_terms
+        self.eps = eps
+
+    @classmethod
+    def from_lines(cls, lines, eps=elimination.EPSILON):
+        lines = list(lines)
+        return cls([l.normal_vector.coordinates for l in lines], [l.constant_term for l in lines], eps)
+
+    def to_lines(self):
+        return [Line(Vector(n), k) for n, k in zip(self.normal_vectors.tolist(), self.constant_terms.tolist())]
+
+    def _intersect(self, a1, b1, k1, a2, b2, k2):
+        # Cramer's rule on every pair at once. A pair is parallel when the
+        # determinant is small relative to |n1||n2| (the sine of the angle
+        # between the normals); a parallel pair is coincident when the
+        # augmented rows (a, b, k) are proportional as well.
+        det = a1 * b2 - b1 * a2
+        norm1 = np.sqrt(a1 * a1 + b1 * b1)
+        norm2 = np.sqrt(a2 * a2 + b2 * b2)
+        parallel = np.abs(det) <= self.eps * norm1 * norm2
+
+        augmented = np.sqrt(a1 * a1 + b1 * b1 + k1 * k1) * np.sqrt(a2 * a2 + b2 * b2 + k2 * k2)
+        coincident = parallel & (np.abs(a1 * k2 - a2 * k1) <= self.eps * augmented) \
+            & (np.abs(b1 * k2 - b2 * k1) <= self.eps * augmented)
+
+        status = np.full(det.shape, self.INTERSECTING, dtype=np.int8)
+        status[parallel] = self.PARALLEL
+        status[coincident] = self.COINCIDENT
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            safe_det = np.where(parallel, np.nan, det)
+            points = np.stack([(b2 * k1 - b1 * k2) / safe_det, (a1 * k2 - a2 * k1) / safe_det], axis=-1)
+        return points, status
+
+    def _columns(self):
+        return self.normal_vectors[:, 0], self.normal_vectors[:, 1], self.constant_terms
+
+    def intersect_with(self, other):
+        a1, b1, k1 = self._columns()
+        if isinstance(other, Line):
+            (a2, b2), k2 = other.normal_vector.coordinates, other.constant_term
+        else:
+            a2, b2, k2 = other._columns()
+        return self._intersect(a1, b1, k1, a2, b2, k2)
+
+    def intersect_all(self, other):
+        a1, b1, k1 = [c[:, np.newaxis] for c in self._columns()]
+        a2, b2, k2 = [c[np.newaxis, :] for c in other._columns()]
+        return self._intersect(a1, b1, k1, a2, b2, k2)
+
+    def iter_intersect_all(self, other, chunk_size=1024):
+        for start in range(0, len(self), chunk_size):
+            points, status = self[start:start + chunk_size].intersect_all(other)
+            yield start, points, status
+
+    def intersect_within(self):
+        first, second = np.triu_indices(len(self), 1)
+        points, status = self[first].intersect_with(self[second])
+        return first, second, points, status
+
+    def __len__(self):
+        return self.normal_vectors.shape[0]
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return Line(Vector(self.normal_vectors[item].tolist()), float(self.constant_terms[item]))
+        return LineBatch(self.normal_vectors[item], self.constant_terms[item], self.eps)
+
+    def __str__(self):
+        return 'LineBatch: {} lines'.format(len(self))
+
+
+if __name__ == "__main__":
+    l1 = Line(Vector([4.046, 2.836]), 1.21)
+    l2 = Line(Vector([10.115, 7.09]), 3.025)
+    l3 = Line(Vector([7.204, 3.182]), 8.68)
+    l4 = Line(Vector([8.172, 4.114]), 9.883)
+    l5 = Line(Vector([1.182, 5.562]), 6.744)
+    l6 = Line(Vector([1.773, 8.343]), 9.525)
+
+    points, status = LineBatch.from_lines([l1, l3, l5]).intersect_with(LineBatch.from_lines([l2, l4, l6]))
+    if not (list(status) == [LineBatch.COINCIDENT, LineBatch.INTERSECTING, LineBatch.PARALLEL] and
+                    Vector(np.round(points[1], 3).tolist()) == l3.intersect_with(l4) and
+                    np.isnan(points[0]).all() and np.isnan(points[2]).all()):
+        print('test case 1 failed')
+
+    batch = LineBatch.from_lines([l1, l2, l3, l4, l5, l6])
+    points, status = batch.intersect_all(batch)
+    if not (points.shape == (6, 6, 2) and
+                    (np.diag(status) == LineBatch.COINCIDENT).all() and
+                    (status == status.T).all()):
+        print('test case 2 failed')
+
+    chunks = list(batch.iter_intersect_all(batch, chunk_size=4))
+    if not (len(chunks) == 2 and
+                    np.array_equal(np.concatenate([c[2] for c in chunks]), status)):
+        print('test case 3 failed')
+
+    first, second, pair_points, pair_status = batch.intersect_within()
+    if not (len(first) == 15 and np.array_equal(pair_status, status[first, second])):
+        print('test case 4 failed')
@@ -1,14 +1,19 @@
-from decimal import Decimal, getcontext
 from copy import deepcopy
 
+import numpy as np
+
 from vector import Vector
 from plane import Plane
-
-getcontext().prec = 30
+import elimination
+import exact
+import instrument
+import qr
+import wire
 
 
 class LinearSystem(object):
     ALL_PLANES_MUST_BE_IN_SAME_DIM_MSG = 'All planes in the system should live in the same dimension'
+    ALL_SYSTEMS_MUST_HAVE_SAME_SHAPE_MSG = 'All systems in a batch should have the same number of equations and unknowns'
     NO_SOLUTIONS_MSG = 'No solutions'
     INF_SOLUTIONS_MSG = 'Infinitely many solutions'
 
@@ -26,18 +31,24 @@ class LinearSystem(object):
 
     def swap_rows(self, row1, row2):
         if row1 < len(self.planes) and row2 < len(self.planes):
+            if instrument.enabled:
+                instrument.count('row_swaps')
             temp = self.planes[row1]
             self.planes[row1] = self.planes[row2]
             self.planes[row2] = temp
 
     def multiply_coefficient_and_row(self, coefficient, row):
         if row < len(self.planes):
+            if instrument.enabled:
+                instrument.count('row_scalings')
             new_normal_vector = self.planes[row].normal_vector.times_scalar(coefficient)
             new_constant_term = self.planes[row].constant_term * coefficient
             self.planes[row] = Plane(new_normal_vector, new_constant_term)
 
     def add_multiple_times_row_to_row(self, coefficient, row_to_add, row_to_be_added_to):
         if row_to_add < len(self.planes) and row_to_be_added_to < len(self.planes):
+            if instrument.enabled:
+                instrument.count('row_additions')
             plane1 = self.planes[row_to_be_added_to]
             plane2 = self.planes[row_to_add]
             vector_to_add = plane2.normal_vector.times_scalar(coefficient)
@@ -46,27 +57,192 @@ class LinearSystem(object):
             self.planes[row_to_be_added_to] = Plane(new_normal_vector, new_constant_term)
 
     def compute_triangular_form(self):
-        system = deepcopy(self)
-        coefficient_index = 0
-        for row in range(0, len(system)):
-            while coefficient_index < system.dimension:
-                if system[row].normal_vector[coefficient_index] == 0:
-                    searched_index = system.search_row_with_nonzero_coefficient(row + 1, coefficient_index)
-                    if searched_index != -1:
-                        system.swap_rows(row, searched_index)
-                    else:
-                        coefficient_index += 1
-                        continue
-                for cleaned_row in range(row + 1, len(system)):
-                    current_coefficient = system[cleaned_row].normal_vector[coefficient_index]
-                    if current_coefficient != 0:
-                        add_coefficient = -1 * current_coefficient / system[row].normal_vector[coefficient_index]
-                        system.add_multiple_times_row_to_row(add_coefficient, row, cleaned_row)
-                coefficient_index += 1
-                break
+        with instrument.phase('copy'):
+            system = deepcopy(self)
+        with instrument.phase('forward_elimination'):
+            coefficient_index = 0
+            for row in range(0, len(system)):
+                while coefficient_index < system.dimension:
+                    if system[row].normal_vector[coefficient_index] == 0:
+                        searched_index = system.search_row_with_nonzero_coefficient(row + 1, coefficient_index)
+                        if searched_index != -1:
+                            system.swap_rows(row, searched_index)
+                        else:
+                            coefficient_index += 1
+                            continue
+                    for cleaned_row in range(row + 1, len(system)):
+                        current_coefficient = system[cleaned_row].normal_vector[coefficient_index]
+                        if current_coefficient != 0:
+                            add_coefficient = -1 * current_coefficient / system[row].normal_vector[coefficient_index]
+                            system.add_multiple_times_row_to_row(add_coefficient, row, cleaned_row)
+                    coefficient_index += 1
+                    break
+        if instrument.enabled:
+            instrument.record_growth(elimination.growth(self.to_matrix(), system.to_matrix()))
         return system
 
+    def compute_triangular_form_dense(self):
+        with instrument.phase('copy'):
+            matrix = self.to_matrix()
+        with instrument.phase('forward_elimination'):
+            elimination.triangularize(matrix, elimination.row_tolerance(matrix))
+        with instrument.phase('copy'):
+            return LinearSystem.from_matrix(matrix)
+
+    def compute_triangular_form_blocked(self, block_size=elimination.BLOCK_SIZE, threads=1):
+        # For large systems: blocked LU on the augmented matrix (see
+        # elimination.lu_factor_blocked). It pivots on the largest entry
+        # rather than the first nonzero one, so rows can come out in a
+        # different order than compute_triangular_form. Systems it cannot
+        # finish (not square, or singular) take the dense path.
+        with instrument.phase('copy'):
+            matrix = self.to_matrix()
+        if len(self) == self.dimension:
+            with instrument.phase('forward_elimination'):
+                permutation = elimination.lu_factor_blocked(matrix, elimination.row_tolerance(matrix), block_size, threads)
+            if permutation is not None:
+                with instrument.phase('copy'):
+                    return LinearSystem.from_matrix(np.triu(matrix))
+        return self.compute_triangular_form_dense()
+
+    def compute_rref(self):
+        with instrument.phase('copy'):
+            matrix = self.to_matrix()
+        with instrument.phase('forward_elimination'):
+            elimination.reduce_row_echelon(matrix, elimination.row_tolerance(matrix))
+        with instrument.phase('copy'):
+            return LinearSystem.from_matrix(matrix)
+
+    def solve(self, backend=None):
+        # Gauss-Jordan clears above each pivot as it goes, so the
+        # back_substitution phase only classifies and reads off the solution.
+        # A backend (see backend.py) takes over the whole solve in its own
+        # number type instead.
+        if backend is not None:
+            return backend.solve(self)
+        with instrument.phase('copy'):
+            matrix = self.to_matrix()
+        with instrument.phase('forward_elimination'):
+            tol = elimination.row_tolerance(matrix)
+            pivot_columns = elimination.reduce_row_echelon(matrix, tol)
+        with instrument.phase('back_substitution'):
+            return self.solution_from_rref(matrix, pivot_columns, tol)
+
+    def solve_blocked(self, block_size=elimination.BLOCK_SIZE, threads=1):
+        # solve() through the blocked LU for large square systems with a
+        # unique solution; everything else goes through solve().
+        with instrument.phase('copy'):
+            matrix = self.to_matrix()
+        if len(self) == self.dimension:
+            with instrument.phase('forward_elimination'):
+                permutation = elimination.lu_factor_blocked(matrix, elimination.row_tolerance(matrix), block_size, threads)
+            if permutation is not None:
+                with instrument.phase('back_substitution'):
+                    return Vector(qr.back_substitute(matrix[:, :-1], matrix[:, -1]).tolist())
+        return self.solve()
+
+    @classmethod
+    def solution_from_rref(cls, matrix, pivot_columns, tol=elimination.EPSILON):
+        status = elimination.classify(matrix, pivot_columns, tol)
+        if status == elimination.NO_SOLUTION:
+            raise Exception(cls.NO_SOLUTIONS_MSG)
+        basepoint, direction_vectors = elimination.parametrize(matrix, pivot_columns)
+        if status == elimination.UNIQUE_SOLUTION:
+            return Vector(basepoint.tolist())
+        return Parametrization(Vector(basepoint.tolist()), [Vector(d) for d in direction_vectors.tolist()])
+
+    def solve_least_squares(self):
+        # Best fit for systems with more (possibly inconsistent) planes than
+        # unknowns: the point minimizing the norm of the residuals, with free
+        # variables set to zero when the planes do not pin one down. Returns
+        # the point and the residual norm, which is 0 for a consistent system.
+        with instrument.phase('copy'):
+            matrix = self.to_matrix()
+        with instrument.phase('forward_elimination'):
+            factorization = qr.QRFactorization(matrix[:, :-1])
+        with instrument.phase('back_substitution'):
+            x, residual = factorization.least_squares(matrix[:, -1])
+        return Vector(x.tolist()), float(residual)
+
+    def solve_exact(self):
+        rows = exact.integer_rows(self.planes)
+        pivot_columns = exact.bareiss(rows)
+        status = exact.classify(rows, pivot_columns)
+        if status == elimination.NO_SOLUTION:
+            raise Exception(self.NO_SOLUTIONS_MSG)
+        basepoint, direction_vectors = exact.parametrize(rows, pivot_columns)
+        if status == elimination.UNIQUE_SOLUTION:
+            return Vector(basepoint)
+        return Parametrization(Vector(basepoint), [Vector(d) for d in direction_vectors])
+
+    def rank_exact(self):
+        return len(exact.bareiss(exact.integer_rows(self.planes)))
+
+    @classmethod
+    def solve_batch(cls, systems):
+        if isinstance(systems, np.ndarray):
+            matrices = np.array(systems, dtype=np.float64)
+        else:
+            matrices = [s.to_matrix() for s in systems]
+            for m in matrices:
+                if m.shape != matrices[0].shape:
+                    raise Exception(cls.ALL_SYSTEMS_MUST_HAVE_SAME_SHAPE_MSG)
+            matrices = np.stack(matrices)
+        if matrices.ndim != 3:
+            raise Exception(cls.ALL_SYSTEMS_MUST_HAVE_SAME_SHAPE_MSG)
+
+        tol = elimination.row_tolerance(matrices)
+        pivot_columns = elimination.reduce_row_echelon_batch(matrices, tol)
+        status = elimination.classify_batch(matrices, pivot_columns, tol)
+        solutions = elimination.basepoints_batch(matrices, pivot_columns)
+        solutions[status == elimination.NO_SOLUTION] = np.nan
+        return status, solutions
+
+    def to_matrix(self):
+        return elimination.augmented_matrix(self.planes)
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        return cls([Plane(Vector(row[:-1]), row[-1]) for row in matrix.tolist()])
+
+    def to_bytes(self, encoding='auto'):
+        # 'auto' follows Vector.to_bytes (wire.choose_encoding): float64 only
+        # when every value is a float, so ints, Decimals and Fractions come
+        # back as they went in. A matrix-backed system holds floats only.
+        if encoding == 'auto' and isinstance(self, MatrixLinearSystem) and self._planes is None:
+            encoding = 'float64'
+        if encoding != 'float64':
+            values = [x for p in self.planes for x in p.normal_vector.coordinates + (p.constant_term,)]
+            if wire.choose_encoding(values, encoding) == wire.EXACT:
+                return wire.encode(wire.SYSTEM, len(self), self.dimension, values, wire.EXACT)
+        matrix = np.ascontiguousarray(self.to_matrix(), dtype='<f8')
+        return wire.HEADER.pack(wire.MAGIC, wire.SYSTEM, wire.FLOAT64, len(self), self.dimension) + matrix.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        # A float64 payload becomes a MatrixLinearSystem viewing the buffer
+        # itself, without copying it.
+        encoding, rows, dimension, payload = wire.decode_header(data, wire.SYSTEM)
+        count = rows * (dimension + 1)
+        if encoding == wire.FLOAT64:
+            if len(payload) != count * 8:
+                raise Exception(wire.TRUNCATED_PAYLOAD_MSG)
+            matrix = np.frombuffer(payload, dtype='<f8').reshape(rows, dimension + 1)
+            return MatrixLinearSystem(matrix)
+        values = wire.decode_exact(payload, count)
+        width = dimension + 1
+        return cls([Plane(Vector(values[i:i + dimension]), values[i + dimension]) for i in range(0, count, width)])
+
+    def as_memoryview(self):
+        return memoryview(np.ascontiguousarray(self.to_matrix()))
+
+    # Same as Vector.__buffer__.
+    def __buffer__(self, flags):
+        return self.as_memoryview()
+
     def search_row_with_nonzero_coefficient(self, row_from, coefficient_index):
+        if instrument.enabled:
+            instrument.count('pivot_searches')
         searched_index = -1
         for row in range(row_from, len(self)):
             if self[row].normal_vector[coefficient_index] != 0:
@@ -112,9 +288,72 @@ class LinearSystem(object):
         return ret
 
 
-class MyDecimal(Decimal):
-    def is_near_zero(self, eps=1e-10):
-        return abs(self) < eps
+class MatrixLinearSystem(LinearSystem):
+    # A LinearSystem backed directly by an (m, n+1) augmented array, which may
+    # be a read-only memory map. Plane objects are only built for the rows
+    # that get indexed; anything that needs the full list of planes (row
+    # operations, the reference triangular form) materializes it once.
+    MATRIX_MUST_BE_TWO_DIMENSIONAL_MSG = 'The augmented matrix must be an (m, n+1) array'
+
+    def __init__(self, matrix):
+        if matrix.ndim != 2 or matrix.shape[1] < 2:
+            raise Exception(self.MATRIX_MUST_BE_TWO_DIMENSIONAL_MSG)
+        self.matrix = matrix
+        self.dimension = matrix.shape[1] - 1
+        self._planes = None
+
+    @property
+    def planes(self):
+        if self._planes is None:
+            self._planes = [self._plane(i) for i in range(len(self.matrix))]
+        return self._planes
+
+    @planes.setter
+    def planes(self, planes):
+        self._planes = planes
+
+    def _plane(self, i):
+        row = self.matrix[i].tolist()
+        return Plane(Vector(row[:-1]), row[-1])
+
+    def to_matrix(self):
+        if self._planes is None:
+            return np.array(self.matrix, dtype=np.float64)
+        return LinearSystem.to_matrix(self)
+
+    def __len__(self):
+        if self._planes is None:
+            return len(self.matrix)
+        return len(self._planes)
+
+    def __getitem__(self, i):
+        if self._planes is None:
+            return self._plane(i)
+        return self._planes[i]
+
+
+class Parametrization(object):
+    BASEPT_AND_DIR_VECTORS_MUST_BE_IN_SAME_DIM = 'The basepoint and direction vectors should all live in the same dimension'
+
+    def __init__(self, basepoint, direction_vectors):
+        try:
+            self.basepoint = basepoint
+            self.direction_vectors = direction_vectors
+            self.dimension = basepoint.dimension
+            for v in direction_vectors:
+                assert v.dimension == self.dimension
+
+        except AssertionError:
+            raise Exception(self.BASEPT_AND_DIR_VECTORS_MUST_BE_IN_SAME_DIM)
+
+    def __str__(self):
+        output = ''
+        for coord in range(self.dimension):
+            output += 'x_{} = {} '.format(coord + 1, round(self.basepoint[coord], 3))
+            for free_var, vector in enumerate(self.direction_vectors):
+                output += '+ {} t_{}'.format(round(vector[coord], 3), free_var + 1)
+            output += '\n'
+        return output
 
 
 if __name__ == "__main__":
@@ -214,3 +453,218 @@ if __name__ == "__main__":
                     t[2] == Plane(normal_vector=Vector([0, 0, -9]), constant_term=-2)):
         print('test case 4 failed')
 
+    #Dense engine must agree with the reference implementation
+    p1 = Plane(normal_vector=Vector([1, 1, 1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([0, 1, 0]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1, 1, -1]), constant_term=3)
+    p4 = Plane(normal_vector=Vector([1, 0, -2]), constant_term=2)
+    s = LinearSystem([p1, p2, p3, p4])
+    t = s.compute_triangular_form_dense()
+    if not (t[0] == p1 and
+                    t[1] == p2 and
+                    t[2] == Plane(normal_vector=Vector([0, 0, -2]), constant_term=2) and
+                    t[3] == Plane()):
+        print('dense test case 1 failed')
+
+    p1 = Plane(normal_vector=Vector([0, 1, 1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1, -1, 1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1, 2, -5]), constant_term=3)
+    s = LinearSystem([p1, p2, p3])
+    t = s.compute_triangular_form_dense()
+    if not (t[0] == Plane(normal_vector=Vector([1, -1, 1]), constant_term=2) and
+                    t[1] == Plane(normal_vector=Vector([0, 1, 1]), constant_term=1) and
+                    t[2] == Plane(normal_vector=Vector([0, 0, -9]), constant_term=-2)):
+        print('dense test case 2 failed')
+
+    tiny = LinearSystem.from_matrix(np.array([[1e-11, 2e-11, 0, 1e-11], [2e-11, 1e-11, 0, 1e-11], [0, 0, 1e-11, 1e-11]]))
+    if not np.allclose(tiny.compute_triangular_form_dense().to_matrix(), tiny.compute_triangular_form().to_matrix(),
+                       rtol=1e-9, atol=0):
+        print('dense test case 3 failed')
+
+    scaled = LinearSystem.from_matrix(np.array([[0, 1e-6, 0, 1], [1e6, 0, 0, 1], [0, 0, 1, 1]]))
+    if not np.array_equal(scaled.compute_triangular_form_dense().to_matrix(), scaled.compute_triangular_form().to_matrix()):
+        print('dense test case 4 failed')
+
+    #Quiz : Coding RREF and solutions
+    p1 = Plane(normal_vector=Vector([1, 1, 1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([0, 1, 1]), constant_term=2)
+    s = LinearSystem([p1, p2])
+    r = s.compute_rref()
+    if not (r[0] == Plane(normal_vector=Vector([1, 0, 0]), constant_term=-1) and
+                    r[1] == p2):
+        print('rref test case 1 failed')
+
+    p1 = Plane(normal_vector=Vector([0, 1, 1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1, -1, 1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1, 2, -5]), constant_term=3)
+    s = LinearSystem([p1, p2, p3])
+    r = s.compute_rref()
+    if not (r[0] == Plane(normal_vector=Vector([1, 0, 0]), constant_term=23/9.) and
+                    r[1] == Plane(normal_vector=Vector([0, 1, 0]), constant_term=7/9.) and
+                    r[2] == Plane(normal_vector=Vector([0, 0, 1]), constant_term=2/9.)):
+        print('rref test case 2 failed')
+
+    x = s.solve()
+    if not all(abs(a - b) < 1e-10 for a, b in zip(x, [23/9., 7/9., 2/9.])):
+        print('solve test case 1 failed')
+
+    p1 = Plane(normal_vector=Vector([1, 1, 1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1, 1, 1]), constant_term=2)
+    try:
+        LinearSystem([p1, p2]).solve()
+        print('solve test case 2 failed')
+    except Exception as e:
+        if str(e) != LinearSystem.NO_SOLUTIONS_MSG:
+            print('solve test case 2 failed')
+
+    p1 = Plane(normal_vector=Vector([1, 1, 1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([0, 1, 1]), constant_term=2)
+    solution = LinearSystem([p1, p2]).solve()
+    if not (isinstance(solution, Parametrization) and
+                    solution.basepoint == Vector([-1, 2, 0]) and
+                    solution.direction_vectors == [Vector([0, -1, 1])]):
+        print('solve test case 3 failed')
+
+    # Thresholds are per row: rows of very different scale keep their pivots
+    # and their inconsistencies.
+    scaled = LinearSystem([Plane(normal_vector=Vector([1e6, 0, 0]), constant_term=1),
+                           Plane(normal_vector=Vector([0, 1e-6, 0]), constant_term=1),
+                           Plane(normal_vector=Vector([0, 0, 1]), constant_term=1)])
+    if not np.allclose(scaled.solve().coordinates, [1e-6, 1e6, 1], rtol=1e-12, atol=0):
+        print('solve test case 4 failed')
+    try:
+        LinearSystem([Plane(normal_vector=Vector([1e6, 0, 0]), constant_term=1),
+                      Plane(normal_vector=Vector([0, 1e-6, 1e-6]), constant_term=1e-6),
+                      Plane(normal_vector=Vector([0, 2e-6, 2e-6]), constant_term=3e-6)]).solve()
+        print('solve test case 5 failed')
+    except Exception as e:
+        if str(e) != LinearSystem.NO_SOLUTIONS_MSG:
+            print('solve test case 5 failed')
+
+    #Batched solve must agree with the single-system path
+    systems = [LinearSystem([Plane(normal_vector=Vector([0, 1, 1]), constant_term=1),
+                             Plane(normal_vector=Vector([1, -1, 1]), constant_term=2),
+                             Plane(normal_vector=Vector([1, 2, -5]), constant_term=3)]),
+               LinearSystem([Plane(normal_vector=Vector([1, 1, 1]), constant_term=1),
+                             Plane(normal_vector=Vector([1, 1, 1]), constant_term=2),
+                             Plane(normal_vector=Vector([0, 0, 1]), constant_term=2)]),
+               LinearSystem([Plane(normal_vector=Vector([1, 1, 1]), constant_term=1),
+                             Plane(normal_vector=Vector([0, 1, 1]), constant_term=2),
+                             Plane(normal_vector=Vector([1, 2, 2]), constant_term=3)])]
+    status, solutions = LinearSystem.solve_batch(systems)
+    if not (list(status) == [elimination.UNIQUE_SOLUTION, elimination.NO_SOLUTION, elimination.INFINITE_SOLUTIONS] and
+                    Vector(solutions[0].tolist()) == systems[0].solve() and
+                    Vector(solutions[2].tolist()) == systems[2].solve().basepoint):
+        print('batch test case 1 failed')
+
+    # Tolerances are relative: a uniformly tiny system keeps its unique answer.
+    tiny = np.array([[1e-11, 2e-11, 0, 1e-11], [2e-11, 1e-11, 0, 1e-11], [0, 0, 1e-11, 1e-11]])
+    status, solutions = LinearSystem.solve_batch(tiny[np.newaxis])
+    if not (np.allclose(LinearSystem.from_matrix(tiny).solve().coordinates, [1 / 3, 1 / 3, 1]) and
+                    list(status) == [elimination.UNIQUE_SOLUTION] and np.allclose(solutions[0], [1 / 3, 1 / 3, 1])):
+        print('batch test case 2 failed')
+
+    scaled = np.array([[1e6, 0, 0, 1], [0, 1e-6, 0, 1], [0, 0, 1, 1]])
+    status, solutions = LinearSystem.solve_batch(scaled[np.newaxis])
+    if not (status[0] == elimination.UNIQUE_SOLUTION and
+                    np.allclose(solutions[0], [1e-6, 1e6, 1], rtol=1e-12, atol=0)):
+        print('batch test case 3 failed')
+
+    #Least squares
+    p1 = Plane(normal_vector=Vector([1, 0]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([0, 1]), constant_term=1)
+    p3 = Plane(normal_vector=Vector([1, 1]), constant_term=3)
+    point, residual = LinearSystem([p1, p2, p3]).solve_least_squares()
+    if not (all(abs(x - 4 / 3.) < 1e-12 for x in point) and abs(residual - 1 / 3. ** 0.5) < 1e-12):
+        print('least squares test case 1 failed')
+
+    s = LinearSystem([Plane(normal_vector=Vector([0, 1, 1]), constant_term=1),
+                      Plane(normal_vector=Vector([1, -1, 1]), constant_term=2),
+                      Plane(normal_vector=Vector([1, 2, -5]), constant_term=3),
+                      Plane(normal_vector=Vector([2, 1, -4]), constant_term=5)])
+    point, residual = s.solve_least_squares()
+    if not (all(abs(x - y) < 1e-12 for x, y in zip(point, s.solve())) and residual < 1e-12):
+        print('least squares test case 2 failed')
+
+    #Exact mode
+    from decimal import Decimal
+    from fractions import Fraction
+    p1 = Plane(normal_vector=Vector([0, 1, 1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1, -1, 1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1, 2, -5]), constant_term=3)
+    s = LinearSystem([p1, p2, p3])
+    if not (s.solve_exact() == Vector([Fraction(23, 9), Fraction(7, 9), Fraction(2, 9)]) and s.rank_exact() == 3):
+        print('exact test case 1 failed')
+
+    p1 = Plane(normal_vector=Vector([Decimal('0.1'), Fraction(1, 3), 1]), constant_term=Decimal('0.7'))
+    p2 = Plane(normal_vector=Vector([Decimal('0.2'), Fraction(2, 3), 2]), constant_term=Decimal('1.4'))
+    solution = LinearSystem([p1, p2]).solve_exact()
+    if not (isinstance(solution, Parametrization) and
+                    solution.basepoint == Vector([7, 0, 0]) and
+                    solution.direction_vectors == [Vector([Fraction(-10, 3), 1, 0]), Vector([-10, 0, 1])]):
+        print('exact test case 2 failed')
+
+    #Instrumentation
+    p1 = Plane(normal_vector=Vector([0, 1, 1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1, -1, 1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1, 2, -5]), constant_term=3)
+    s = LinearSystem([p1, p2, p3])
+    exported = []
+    instrument.add_exporter(exported.append)
+    with instrument.collect() as stats:
+        s.compute_triangular_form()
+    instrument.remove_exporter(exported.append)
+    if not (stats.row_swaps == 1 and stats.row_additions == 2 and stats.pivot_searches == 1 and
+                    stats.planes_created == 2 and 'copy' in stats.phase_seconds and exported == [stats]):
+        print('instrument test case 1 failed')
+
+    with instrument.collect() as stats:
+        s.solve()
+    if not (stats.row_swaps == 1 and stats.row_scalings == 3 and stats.max_pivot_growth >= 1 and
+                    sorted(stats.phase_seconds) == ['back_substitution', 'copy', 'forward_elimination']):
+        print('instrument test case 2 failed')
+
+    s.solve()
+    if not (instrument.current() is None and stats.row_scalings == 3):
+        print('instrument test case 3 failed')
+
+    import threading
+
+    def collect_many():
+        for _ in range(2000):
+            with instrument.collect():
+                pass
+
+    workers = [threading.Thread(target=collect_many) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if not (instrument.enabled is False and instrument._active == 0):
+        print('instrument test case 4 failed')
+
+    #Blocked elimination
+    rng = np.random.default_rng(0)
+    matrix = rng.uniform(-1, 1, size=(200, 201))
+    big = LinearSystem.from_matrix(matrix)
+    expected = np.linalg.solve(matrix[:, :-1], matrix[:, -1])
+    for block_size, threads in ((1, 1), (32, 1), (48, 3), (500, 2)):
+        x = big.solve_blocked(block_size, threads)
+        triangular = big.compute_triangular_form_blocked(block_size, threads).to_matrix()
+        if not (np.allclose(x.coordinates, expected) and not np.tril(triangular[:, :-1], -1).any() and
+                        np.allclose(LinearSystem.from_matrix(triangular).solve().coordinates, expected)):
+            print('blocked test case 1 failed for block size {} and {} threads'.format(block_size, threads))
+
+    s = LinearSystem([Plane(normal_vector=Vector([1, 1, 1]), constant_term=1),
+                      Plane(normal_vector=Vector([0, 1, 1]), constant_term=2),
+                      Plane(normal_vector=Vector([1, 2, 2]), constant_term=3)])
+    if not (isinstance(s.solve_blocked(), Parametrization) and
+                    str(s.compute_triangular_form_blocked()) == str(s.compute_triangular_form_dense())):
+        print('blocked test case 2 failed')
+
+    scaled = np.array([[1e6, 0, 0, 1], [0, 1e-6, 0, 1], [0, 0, 1, 1]])
+    if not (elimination.lu_factor_blocked(scaled.copy(), elimination.row_tolerance(scaled)) is not None and
+                    elimination.lu_factor(scaled[:, :-1].copy(), elimination.row_tolerance(scaled[:, :-1])) is not None and
+                    np.allclose(LinearSystem.from_matrix(scaled).solve_blocked().coordinates, [1e-6, 1e6, 1],
+                                rtol=1e-12, atol=0)):
+        print('blocked test case 3 failed')
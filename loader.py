@@ -0,0 +1,105 @@
+import csv
+
+import numpy as np
+
+from vector import Vector
+from linesys import LinearSystem, MatrixLinearSystem, Parametrization
+
+CHUNK_ROWS = 65536
+
+
+def iter_csv_rows(path, delimiter=','):
+    # One equation per line: the coefficients followed by the constant term.
+    # Blank lines and lines starting with '#' are skipped.
+    with open(path, newline='') as f:
+        for fields in csv.reader(f, delimiter=delimiter):
+            if not fields or fields[0].lstrip().startswith('#'):
+                continue
+            values = [float(x) for x in fields]
+            yield values[:-1], values[-1]
+
+
+def read_csv(path, delimiter=','):
+    chunks = []
+    rows = []
+    for coefficients, constant_term in iter_csv_rows(path, delimiter):
+        coefficients.append(constant_term)
+        rows.append(coefficients)
+        if len(rows) == CHUNK_ROWS:
+            chunks.append(np.array(rows, dtype=np.float64))
+            rows = []
+    if rows or not chunks:
+        chunks.append(np.array(rows, dtype=np.float64))
+    return MatrixLinearSystem(np.concatenate(chunks) if len(chunks) > 1 else chunks[0])
+
+
+def open_npy(path, mode='r'):
+    return MatrixLinearSystem(np.load(path, mmap_mode=mode))
+
+
+def _as_matrix(obj):
+    if isinstance(obj, MatrixLinearSystem) and obj._planes is None:
+        return obj.matrix
+    if isinstance(obj, LinearSystem):
+        return obj.to_matrix()
+    if isinstance(obj, Vector):
+        return np.array([obj.coordinates], dtype=np.float64)
+    if isinstance(obj, Parametrization):
+        # The basepoint followed by one row per direction vector.
+        return np.array([obj.basepoint.coordinates] + [v.coordinates for v in obj.direction_vectors], dtype=np.float64)
+    return np.atleast_2d(np.asarray(obj, dtype=np.float64))
+
+
+def write_csv(path, obj, delimiter=','):
+    matrix = _as_matrix(obj)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        for start in range(0, len(matrix), CHUNK_ROWS):
+            writer.writerows([repr(x) for x in row] for row in matrix[start:start + CHUNK_ROWS].tolist())
+
+
+def write_npy(path, obj):
+    matrix = _as_matrix(obj)
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=matrix.shape)
+    for start in range(0, len(matrix), CHUNK_ROWS):
+        out[start:start + CHUNK_ROWS] = matrix[start:start + CHUNK_ROWS]
+    out.flush()
+    del out
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    from plane import Plane
+
+    p1 = Plane(normal_vector=Vector([0, 1, 1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1, -1, 1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1, 2, -5]), constant_term=3)
+    s = LinearSystem([p1, p2, p3])
+    directory = tempfile.mkdtemp()
+
+    csv_path = os.path.join(directory, 'system.csv')
+    write_csv(csv_path, s)
+    loaded = read_csv(csv_path)
+    if not (isinstance(loaded, MatrixLinearSystem) and loaded._planes is None and
+                    len(loaded) == 3 and loaded[1] == p2 and loaded._planes is None):
+        print('test case 1 failed')
+    if not list(iter_csv_rows(csv_path))[2] == ([1.0, 2.0, -5.0], 3.0):
+        print('test case 2 failed')
+
+    npy_path = os.path.join(directory, 'system.npy')
+    write_npy(npy_path, loaded)
+    mapped = open_npy(npy_path)
+    if not (isinstance(mapped.matrix, np.memmap) and mapped.solve() == s.solve()):
+        print('test case 3 failed')
+
+    solution_path = os.path.join(directory, 'solution.npy')
+    write_npy(solution_path, mapped.solve())
+    write_csv(os.path.join(directory, 'solution.csv'), mapped.solve())
+    if not (Vector(np.load(solution_path)[0].tolist()) == s.solve() and
+                    read_csv(os.path.join(directory, 'solution.csv')).matrix[0].tolist() == list(s.solve().coordinates)):
+        print('test case 4 failed')
+
+    t = mapped.compute_triangular_form()
+    if not t[2] == Plane(normal_vector=Vector([0, 0, -9]), constant_term=-2):
+        print('test case 5 failed')
@@ -0,0 +1,109 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import elimination
+from linesys import LinearSystem
+
+
+def _reduce_chunk(task):
+    matrix_name, pivot_name, total_size, total_rows, layout = task
+    # Workers only attach to the blocks; the parent owns and unlinks them.
+    matrix_shm = shared_memory.SharedMemory(name=matrix_name)
+    pivot_shm = shared_memory.SharedMemory(name=pivot_name)
+    try:
+        values = np.ndarray((total_size,), dtype=np.float64, buffer=matrix_shm.buf)
+        pivots = np.ndarray((total_rows,), dtype=np.int64, buffer=pivot_shm.buf)
+        for offset, row_offset, num_rows, num_columns, tol in layout:
+            matrix = values[offset:offset + num_rows * num_columns].reshape(num_rows, num_columns)
+            pivot_columns = elimination.reduce_row_echelon(matrix, tol)
+            pivots[row_offset:row_offset + len(pivot_columns)] = pivot_columns
+        del values, pivots, matrix
+    finally:
+        matrix_shm.close()
+        pivot_shm.close()
+    return len(layout)
+
+
+def solve_parallel(systems, max_workers=None, chunk_size=None):
+    # Each system's augmented matrix is copied once into a shared-memory
+    # block that the workers reduce in place, so no Plane or Vector is ever
+    # pickled. Results come back in input order: a Vector, a Parametrization,
+    # or None when the system has no solution.
+    matrices = [s.to_matrix() if isinstance(s, LinearSystem) else np.asarray(s, dtype=np.float64) for s in systems]
+    if not matrices:
+        return []
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(matrices) // (max_workers * 4)))
+
+    layout = []
+    offset = 0
+    row_offset = 0
+    for m in matrices:
+        layout.append((offset, row_offset, m.shape[0], m.shape[1], elimination.row_tolerance(m)))
+        offset += m.size
+        row_offset += m.shape[0]
+
+    matrix_shm = shared_memory.SharedMemory(create=True, size=max(offset, 1) * 8)
+    pivot_shm = shared_memory.SharedMemory(create=True, size=max(row_offset, 1) * 8)
+    try:
+        values = np.ndarray((offset,), dtype=np.float64, buffer=matrix_shm.buf)
+        pivots = np.ndarray((row_offset,), dtype=np.int64, buffer=pivot_shm.buf)
+        for (start, _, _, _, _), m in zip(layout, matrices):
+            values[start:start + m.size] = m.ravel()
+        pivots[:] = -1
+
+        tasks = [(matrix_shm.name, pivot_shm.name, offset, row_offset, layout[i:i + chunk_size])
+                 for i in range(0, len(layout), chunk_size)]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for _ in executor.map(_reduce_chunk, tasks):
+                pass
+
+        results = []
+        for start, row_start, num_rows, num_columns, tol in layout:
+            matrix = values[start:start + num_rows * num_columns].reshape(num_rows, num_columns)
+            pivot_columns = [int(c) for c in pivots[row_start:row_start + num_rows] if c >= 0]
+            try:
+                results.append(LinearSystem.solution_from_rref(matrix, pivot_columns, tol))
+            except Exception as e:
+                if str(e) == LinearSystem.NO_SOLUTIONS_MSG:
+                    results.append(None)
+                else:
+                    raise e
+        del values, pivots, matrix
+        return results
+    finally:
+        matrix_shm.close()
+        matrix_shm.unlink()
+        pivot_shm.close()
+        pivot_shm.unlink()
+
+
+if __name__ == "__main__":
+    from vector import Vector
+    from plane import Plane
+    from linesys import Parametrization
+
+    systems = [LinearSystem([Plane(normal_vector=Vector([0, 1, 1]), constant_term=1),
+                             Plane(normal_vector=Vector([1, -1, 1]), constant_term=2),
+                             Plane(normal_vector=Vector([1, 2, -5]), constant_term=3)]),
+               LinearSystem([Plane(normal_vector=Vector([1, 1, 1]), constant_term=1),
+                             Plane(normal_vector=Vector([1, 1, 1]), constant_term=2)]),
+               LinearSystem([Plane(normal_vector=Vector([1, 1, 1]), constant_term=1),
+                             Plane(normal_vector=Vector([0, 1, 1]), constant_term=2)])]
+    results = solve_parallel(systems, max_workers=2, chunk_size=1)
+    if not (results[0] == systems[0].solve() and
+                    results[1] is None and
+                    isinstance(results[2], Parametrization) and
+                    results[2].basepoint == systems[2].solve().basepoint):
+        print('test case 1 failed')
+
+    rng = np.random.default_rng(0)
+    matrices = [rng.normal(size=(n, n + 1)) for n in rng.integers(2, 20, size=200)]
+    results = solve_parallel(matrices, max_workers=2)
+    if not all(r == LinearSystem.from_matrix(m).solve() for r, m in zip(results, matrices)):
+        print('test case 2 failed')
@@ -1,27 +1,33 @@
-from decimal import Decimal, getcontext
-
-from vector import Vector
-
-getcontext().prec = 30
+from vector import Vector, is_near_zero
+import instrument
 
 
 class Plane(object):
 
     NO_NONZERO_ELTS_FOUND_MSG = 'No nonzero elements found'
+    DEFAULT_DIMENSION = 3
 
     def __init__(self, normal_vector=None, constant_term=None):
-        self.dimension = 3
-
+        if instrument.enabled:
+            instrument.count('planes_created')
         if not normal_vector:
-            all_zeros = [0]*self.dimension
+            all_zeros = [0]*self.DEFAULT_DIMENSION
             normal_vector = Vector(all_zeros)
         self.normal_vector = normal_vector
+        self.dimension = normal_vector.dimension
 
         if not constant_term:
             constant_term = 0
         self.constant_term = constant_term
 
-        self.set_basepoint()
+        self._basepoint = None
+        self._basepoint_computed = False
+
+    @property
+    def basepoint(self):
+        if not self._basepoint_computed:
+            self.set_basepoint()
+        return self._basepoint
 
     def set_basepoint(self):
         try:
@@ -33,14 +39,16 @@ class Plane(object):
             initial_coefficient = n[initial_index]
 
             basepoint_coords[initial_index] = c/initial_coefficient
-            self.basepoint = Vector(basepoint_coords)
+            self._basepoint = Vector(basepoint_coords)
 
         except Exception as e:
             if str(e) == Plane.NO_NONZERO_ELTS_FOUND_MSG:
-                self.basepoint = None
+                self._basepoint = None
             else:
                 raise e
 
+        self._basepoint_computed = True
+
     def is_parallel(self, l):
         return self.normal_vector.is_parallel(l.normal_vector)
 
@@ -103,18 +111,13 @@ class Plane(object):
     @staticmethod
     def first_nonzero_index(iterable):
         for k, item in enumerate(iterable):
-            if not MyDecimal(item).is_near_zero():
+            if not is_near_zero(item):
                 return k
         raise Exception(Plane.NO_NONZERO_ELTS_FOUND_MSG)
 
 
-class MyDecimal(Decimal):
-    def is_near_zero(self, eps=1e-10):
-        return abs(self) < eps
-
 
 if __name__ == "__main__":
-    print(getcontext().prec)
     # Quiz 1
     p1 = Plane(Vector([-0.412, 3.806, 0.728]), -3.46)
     p2 = Plane(Vector([1.03, -9.515, -1.82]), 8.65)
@@ -0,0 +1,171 @@
+import numpy as np
+
+from vector import Vector
+from vectorbatch import VectorBatch
+import elimination
+
+
+def householder_qr(matrix, tol=elimination.EPSILON):
+    # In-place Householder QR with column pivoting: the column whose
+    # remaining norm is largest relative to its threshold in tol (one per
+    # column, or one for all) goes next, and the factorization stops once
+    # no norm exceeds its threshold, so the rank comes out of it. Afterwards the
+    # upper triangle of the first `rank` rows holds R, and column k below
+    # the diagonal holds reflector k (its leading 1 implied), which is
+    # H_k = I - tau[k] v v^T.
+    num_rows, num_columns = matrix.shape
+    tol = np.array(np.broadcast_to(tol, (num_columns,)), dtype=np.float64)
+    permutation = np.arange(num_columns)
+    tau = np.zeros(min(num_rows, num_columns))
+    rank = 0
+    for k in range(min(num_rows, num_columns)):
+        trailing = matrix[k:, k:]
+        norms = np.einsum('ij,ij->j', trailing, trailing)
+        j = k + int(np.argmax(norms / (tol[k:] * tol[k:])))
+        if np.sqrt(norms[j - k]) <= tol[j]:
+            break
+        if j != k:
+            matrix[:, [k, j]] = matrix[:, [j, k]]
+            tol[[k, j]] = tol[[j, k]]
+            permutation[[k, j]] = permutation[[j, k]]
+
+        x0 = matrix[k, k]
+        beta = -np.copysign(np.sqrt(norms[j - k]), x0)
+        v = matrix[k:, k].copy()
+        v[0] = 1.0
+        v[1:] /= x0 - beta
+        tau[k] = (beta - x0) / beta
+        matrix[k:, k + 1:] -= np.outer(tau[k] * v, v @ matrix[k:, k + 1:])
+        matrix[k, k] = beta
+        matrix[k + 1:, k] = v[1:]
+        rank += 1
+    return tau[:rank], permutation, rank
+
+
+def apply_qt(qr, tau, b):
+    # b is (m,) or (m, p); returns Q^T b.
+    b = np.array(b, dtype=np.float64)
+    for k in range(len(tau)):
+        v = np.concatenate(([1.0], qr[k + 1:, k]))
+        b[k:] -= tau[k] * np.multiply.outer(v, v @ b[k:])
+    return b
+
+
+def form_q(qr, tau):
+    # The thin Q: one orthonormal column per reflector.
+    num_rows, rank = qr.shape[0], len(tau)
+    q = np.eye(num_rows, rank)
+    for k in range(rank - 1, -1, -1):
+        v = np.concatenate(([1.0], qr[k + 1:, k]))
+        q[k:] -= np.outer(tau[k] * v, v @ q[k:])
+    return q
+
+
+def back_substitute(r, c):
+    x = np.array(c, dtype=np.float64)
+    for i in range(len(x) - 1, -1, -1):
+        x[i] -= r[i, i + 1:] @ x[i + 1:]
+        x[i] /= r[i, i]
+    return x
+
+
+class QRFactorization(object):
+    WRONG_NUMBER_OF_CONSTANT_TERMS_MSG = 'Each right-hand side needs one constant term per equation'
+
+    def __init__(self, coefficients, tol=None):
+        coefficients = np.array(coefficients, dtype=np.float64)
+        self.shape = coefficients.shape
+        if tol is None:
+            # Per-column thresholds: scaling an unknown leaves the rank unchanged.
+            tol = elimination.row_tolerance(coefficients.T)
+        self.tau, self.permutation, self.rank = householder_qr(coefficients, tol)
+        self.qr = coefficients
+
+    @classmethod
+    def from_system(cls, system):
+        return cls(system.to_matrix()[:, :-1])
+
+    def q(self):
+        return form_q(self.qr, self.tau)
+
+    def r(self):
+        # Rows of R for the columns in self.permutation order.
+        return np.triu(self.qr[:self.rank])
+
+    def least_squares(self, constant_terms):
+        # The basic solution: free (rank-deficient) columns are set to zero.
+        # Returns the solution and the norm of the residual b - A x.
+        b = np.asarray(constant_terms, dtype=np.float64)
+        if b.shape[0] != self.shape[0]:
+            raise Exception(self.WRONG_NUMBER_OF_CONSTANT_TERMS_MSG)
+        c = apply_qt(self.qr, self.tau, b)
+        x = np.zeros((self.shape[1],) + b.shape[1:])
+        x[self.permutation[:self.rank]] = back_substitute(self.qr[:self.rank, :self.rank], c[:self.rank])
+        return x, np.linalg.norm(c[self.rank:], axis=0)
+
+
+def orthonormal_basis(vectors, tol=None):
+    # One Householder pass over all of the vectors at once; the result spans
+    # the same space, with one unit vector per independent direction.
+    coordinates = vectors.coordinates if isinstance(vectors, VectorBatch) else VectorBatch.from_vectors(vectors).coordinates
+    factorization = QRFactorization(coordinates.T, tol)
+    return [Vector(column) for column in factorization.q().T.tolist()]
+
+
+def project(vectors, basis):
+    # Components of every vector parallel and orthogonal to span(basis), as
+    # two VectorBatches; Vector.component_parallel_to for a whole batch and
+    # a basis of any size.
+    coordinates = vectors.coordinates if isinstance(vectors, VectorBatch) else VectorBatch.from_vectors(vectors).coordinates
+    basis = basis.coordinates if isinstance(basis, VectorBatch) else VectorBatch.from_vectors(basis).coordinates
+    q = QRFactorization(basis.T).q()
+    parallel = (coordinates @ q) @ q.T
+    return VectorBatch(parallel), VectorBatch(coordinates - parallel)
+
+
+if __name__ == "__main__":
+    import timeit
+
+    basis = orthonormal_basis([Vector([1, 1, 0]), Vector([2, 2, 0]), Vector([1, 0, 1])])
+    if not (len(basis) == 2 and all(abs(v.magnitude() - 1) < 1e-12 for v in basis) and
+                    abs(basis[0].dot(basis[1])) < 1e-12):
+        print('test case 1 failed')
+
+    v = Vector([3.039, 1.879])
+    b = Vector([0.825, 2.036])
+    parallel, orthogonal = project([v], [b])
+    if not (all(abs(x - y) < 1e-9 for x, y in zip(parallel.to_vectors()[0], v.component_parallel_to(b))) and
+                    all(abs(x - y) < 1e-9 for x, y in zip(orthogonal.to_vectors()[0], v.component_orthogonal_to(b)))):
+        print('test case 2 failed')
+
+    # Fit y = a + b t through points that are not quite on a line.
+    t = np.array([0.0, 1.0, 2.0, 3.0])
+    y = np.array([1.0, 3.1, 4.9, 7.2])
+    x, residual = QRFactorization(np.column_stack([np.ones(4), t])).least_squares(y)
+    expected, expected_residual = np.linalg.lstsq(np.column_stack([np.ones(4), t]), y, rcond=None)[:2]
+    if not (np.allclose(x, expected) and abs(residual - np.sqrt(expected_residual[0])) < 1e-12):
+        print('test case 3 failed')
+
+    rng = np.random.default_rng(0)
+    vectors = [Vector(row) for row in rng.normal(size=(200, 50)).tolist()]
+    basis = orthonormal_basis(vectors)
+    q = np.array([v.coordinates for v in basis])
+    if not (len(basis) == 50 and np.allclose(q @ q.T, np.eye(50), atol=1e-12)):
+        print('test case 4 failed')
+
+    if not QRFactorization(np.diag([1e6, 1e-6, 1.0])).rank == 3:
+        print('test case 5 failed')
+
+    def chained(vectors):
+        basis = []
+        for v in vectors:
+            for u in basis:
+                v = v.minus(v.component_parallel_to(u))
+            if v.magnitude() > 1e-10:
+                basis.append(v.normalized())
+        return basis
+
+    small = [Vector(row) for row in rng.normal(size=(100, 100)).tolist()]
+    print('100 vectors in 100 dims: chained projections {:.1f} ms, householder {:.1f} ms'.format(
+        1000 * min(timeit.repeat(lambda: chained(small), number=1, repeat=1)),
+        1000 * min(timeit.repeat(lambda: orthonormal_basis(small), number=1, repeat=3))))
@@ -0,0 +1,302 @@
+import asyncio
+import collections
+import time
+
+import numpy as np
+
+from vector import Vector
+from line import Line
+from linesys import LinearSystem
+from linebatch import LineBatch
+import elimination
+
+
+def _solve_systems(matrices):
+    # Runs in the executor: one vectorized Gauss-Jordan over a (K, m, n+1)
+    # stack of equally shaped systems.
+    tol = elimination.row_tolerance(matrices)
+    pivot_columns = elimination.reduce_row_echelon_batch(matrices, tol)
+    results = []
+    for matrix, pivots, t in zip(matrices, pivot_columns, tol):
+        try:
+            results.append(LinearSystem.solution_from_rref(matrix, [int(c) for c in pivots if c >= 0], t))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _intersect_lines(pairs):
+    # pairs is (K, 2, 3): rows (a, b, k) of the two lines of every request.
+    first = LineBatch(pairs[:, 0, :2], pairs[:, 0, 2])
+    second = LineBatch(pairs[:, 1, :2], pairs[:, 1, 2])
+    points, status = first.intersect_with(second)
+    return [Vector(p) if s == LineBatch.INTERSECTING else int(s) for p, s in zip(points.tolist(), status.tolist())]
+
+
+class ServiceStats(object):
+    LATENCY_WINDOW = 4096
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.completed = 0
+        self.rejected = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.latencies = collections.deque(maxlen=self.LATENCY_WINDOW)
+
+    def mean_batch_size(self):
+        return self.completed / self.batches if self.batches else 0.0
+
+    def throughput(self):
+        elapsed = time.perf_counter() - self.started
+        return self.completed / elapsed if elapsed else 0.0
+
+    def latency(self, percentile):
+        if not self.latencies:
+            return 0.0
+        return float(np.percentile(self.latencies, percentile))
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'batches': self.batches,
+            'largest_batch': self.largest_batch,
+            'mean_batch_size': self.mean_batch_size(),
+            'throughput': self.throughput(),
+            'latency_p50': self.latency(50),
+            'latency_p99': self.latency(99),
+        }
+
+    def __str__(self):
+        return 'ServiceStats: {}'.format(self.as_dict())
+
+
+class SolverService(object):
+    # Async front end for the batched solvers. Concurrent solve() and
+    # intersect() calls are queued; a single collector task takes whatever
+    # arrived within max_delay of the first request (up to max_batch_size),
+    # groups it by kind and shape, and solves every group as one batch in
+    # the executor, so the event loop never runs elimination itself. While
+    # a batch is being solved the next one accumulates, so batches grow
+    # with the load.
+    #
+    # The queue holds at most max_queue_size requests. When it is full,
+    # callers wait for room (block=True) or are refused straight away.
+    QUEUE_FULL_MSG = 'The solver queue is full'
+    SERVICE_CLOSED_MSG = 'The solver service is closed'
+    NOT_A_LINE_PAIR_MSG = 'intersect() takes two Lines with 2-dimensional normal vectors'
+
+    def __init__(self, max_batch_size=256, max_delay=0.002, max_queue_size=4096, block=True, executor=None):
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.max_queue_size = max_queue_size
+        self.block = block
+        self.executor = executor
+        self.stats = ServiceStats()
+        self._queue = None
+        self._collector = None
+        self._closed = False
+
+    async def start(self):
+        if self._collector is None:
+            self._queue = asyncio.Queue(self.max_queue_size)
+            self._collector = asyncio.get_running_loop().create_task(self._collect())
+            self.stats = ServiceStats()
+        return self
+
+    async def close(self):
+        # Requests already queued are still answered.
+        if self._closed:
+            return
+        self._closed = True
+        if self._collector is not None:
+            await self._queue.put(None)
+            await self._collector
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return False
+
+    async def solve(self, system):
+        # Same answers as LinearSystem.solve: a Vector, a Parametrization,
+        # or the NO_SOLUTIONS_MSG exception.
+        matrix = system.to_matrix() if isinstance(system, LinearSystem) else np.array(system, dtype=np.float64)
+        return await self._submit(('system', matrix.shape), matrix)
+
+    async def intersect(self, line1, line2):
+        # Same answers as Line.intersect_with, except that the point is not
+        # rounded: a Vector, None for parallel lines, or line1 when the two
+        # lines coincide.
+        if not (isinstance(line1, Line) and isinstance(line2, Line) and
+                        line1.normal_vector.dimension == 2 and line2.normal_vector.dimension == 2):
+            raise Exception(self.NOT_A_LINE_PAIR_MSG)
+        pair = [list(line1.normal_vector.coordinates) + [line1.constant_term],
+                list(line2.normal_vector.coordinates) + [line2.constant_term]]
+        pair = np.array(pair, dtype=np.float64)
+        result = await self._submit(('lines', pair.shape), pair)
+        if result == LineBatch.PARALLEL:
+            return None
+        if result == LineBatch.COINCIDENT:
+            return line1
+        return result
+
+    async def _submit(self, group, payload):
+        if self._collector is None:
+            await self.start()
+        if self._closed:
+            raise Exception(self.SERVICE_CLOSED_MSG)
+        future = asyncio.get_running_loop().create_future()
+        request = (group, payload, future, time.perf_counter())
+        if self.block:
+            await self._queue.put(request)
+        else:
+            try:
+                self._queue.put_nowait(request)
+            except asyncio.QueueFull:
+                self.stats.rejected += 1
+                raise Exception(self.QUEUE_FULL_MSG)
+        self.stats.requests += 1
+        return await future
+
+    async def _collect(self):
+        closing = False
+        while not closing:
+            request = await self._queue.get()
+            if request is None:
+                break
+            batch = [request]
+            if self._queue.qsize() + 1 < self.max_batch_size:
+                await asyncio.sleep(self.max_delay)
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                request = self._queue.get_nowait()
+                if request is None:
+                    closing = True
+                    break
+                batch.append(request)
+            await self._dispatch(batch)
+
+    async def _dispatch(self, batch):
+        groups = collections.OrderedDict()
+        for request in batch:
+            groups.setdefault(request[0], []).append(request)
+
+        loop = asyncio.get_running_loop()
+        calls = []
+        for group, requests in groups.items():
+            # A group that cannot be dispatched fails its own requests; the
+            # collector has to stay alive for everyone else.
+            try:
+                payload = np.stack([r[1] for r in requests])
+                worker = _solve_systems if group[0] == 'system' else _intersect_lines
+                calls.append(loop.run_in_executor(self.executor, worker, payload))
+            except Exception as e:
+                failed = loop.create_future()
+                failed.set_exception(e)
+                calls.append(failed)
+        outcomes = await asyncio.gather(*calls, return_exceptions=True)
+
+        now = time.perf_counter()
+        for requests, results in zip(groups.values(), outcomes):
+            if isinstance(results, BaseException):
+                results = [results] * len(requests)
+            for (_, _, future, enqueued), result in zip(requests, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+                self.stats.latencies.append(now - enqueued)
+        self.stats.batches += 1
+        self.stats.completed += len(batch)
+        self.stats.largest_batch = max(self.stats.largest_batch, len(batch))
+
+
+if __name__ == "__main__":
+    from plane import Plane
+    from linesys import Parametrization
+
+    systems = [LinearSystem([Plane(normal_vector=Vector([0, 1, 1]), constant_term=1),
+                             Plane(normal_vector=Vector([1, -1, 1]), constant_term=2),
+                             Plane(normal_vector=Vector([1, 2, -5]), constant_term=3)]),
+               LinearSystem([Plane(normal_vector=Vector([1, 1, 1]), constant_term=1),
+                             Plane(normal_vector=Vector([1, 1, 1]), constant_term=2)]),
+               LinearSystem([Plane(normal_vector=Vector([1, 1, 1]), constant_term=1),
+                             Plane(normal_vector=Vector([0, 1, 1]), constant_term=2)])]
+    l1 = Line(Vector([4.046, 2.836]), 1.21)
+    l2 = Line(Vector([10.115, 7.09]), 3.025)
+    l3 = Line(Vector([7.204, 3.182]), 8.68)
+    l4 = Line(Vector([8.172, 4.114]), 9.883)
+    l5 = Line(Vector([1.182, 5.562]), 6.744)
+    l6 = Line(Vector([1.773, 8.343]), 9.525)
+
+    async def quiz():
+        async with SolverService() as service:
+            results = await asyncio.gather(service.solve(systems[0]), service.solve(systems[1]),
+                                           service.solve(systems[2]), service.intersect(l1, l2),
+                                           service.intersect(l3, l4), service.intersect(l5, l6),
+                                           return_exceptions=True)
+            if not (results[0] == systems[0].solve() and
+                            str(results[1]) == LinearSystem.NO_SOLUTIONS_MSG and
+                            isinstance(results[2], Parametrization) and
+                            results[3] is l1 and
+                            Vector([round(x, 3) for x in results[4]]) == l3.intersect_with(l4) and
+                            results[5] is None):
+                print('test case 1 failed')
+            if not (service.stats.batches == 1 and service.stats.completed == 6):
+                print('test case 2 failed')
+
+        rng = np.random.default_rng(0)
+        matrices = [rng.normal(size=(4, 5)) for _ in range(2000)]
+        async with SolverService(max_batch_size=128) as service:
+            start = time.perf_counter()
+            results = await asyncio.gather(*[service.solve(m) for m in matrices])
+            elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            direct = [LinearSystem.from_matrix(m).solve() for m in matrices]
+            direct_elapsed = time.perf_counter() - start
+            if not all(r == d for r, d in zip(results, direct)):
+                print('test case 3 failed')
+            if not (service.stats.batches < 100 and service.stats.largest_batch == 128):
+                print('test case 4 failed')
+            print('2000 4x5 systems: service {:.0f} solves/s in {} batches (p50 latency {:.1f} ms), '
+                  'one at a time {:.0f} solves/s'.format(len(matrices) / elapsed, service.stats.batches,
+                                                         1000 * service.stats.latency(50),
+                                                         len(matrices) / direct_elapsed))
+
+        async with SolverService(max_queue_size=4, block=False) as service:
+            results = await asyncio.gather(*[service.solve(m) for m in matrices[:10]], return_exceptions=True)
+            refused = [r for r in results if isinstance(r, Exception) and str(r) == SolverService.QUEUE_FULL_MSG]
+            if not (len(refused) == 6 and service.stats.rejected == 6):
+                print('test case 5 failed')
+
+        async with SolverService() as service:
+            try:
+                await service.intersect(l1, Line(Vector([1, 2, 3]), 1))
+                print('test case 6 failed')
+            except Exception as e:
+                if str(e) != SolverService.NOT_A_LINE_PAIR_MSG:
+                    print('test case 6 failed')
+            # A request that breaks its group fails on its own.
+            results = await asyncio.gather(service.solve([1.0, 2.0]), service.solve(systems[0]),
+                                           return_exceptions=True)
+            if not (isinstance(results[0], Exception) and results[1] == systems[0].solve() and
+                            not service._collector.done()):
+                print('test case 7 failed')
+
+        service = SolverService()
+        await service.close()
+        try:
+            await service.solve(systems[0])
+            print('test case 8 failed')
+        except Exception as e:
+            if str(e) != SolverService.SERVICE_CLOSED_MSG:
+                print('test case 8 failed')
+
+    asyncio.run(quiz())
@@ -0,0 +1,239 @@
+import heapq
+
+import numpy as np
+
+from vector import Vector
+from plane import Plane
+from linesys import LinearSystem, Parametrization
+import elimination
+
+
+class SparseLinearSystem(object):
+    WRONG_NUMBER_OF_CONSTANT_TERMS_MSG = 'The system needs one constant term per equation'
+    COLUMN_INDEX_OUT_OF_RANGE_MSG = 'Column indices must be smaller than the dimension'
+    PIVOT_THRESHOLD = 0.1
+
+    def __init__(self, indptr, indices, data, constant_terms, dimension):
+        self.indptr = np.asarray(indptr, dtype=np.intp)
+        self.indices = np.asarray(indices, dtype=np.intp)
+        self.data = np.asarray(data, dtype=np.float64)
+        self.constant_terms = np.asarray(constant_terms, dtype=np.float64)
+        self.dimension = dimension
+        if len(self.constant_terms) != len(self.indptr) - 1:
+            raise Exception(self.WRONG_NUMBER_OF_CONSTANT_TERMS_MSG)
+        if len(self.indices) and self.indices.max() >= dimension:
+            raise Exception(self.COLUMN_INDEX_OUT_OF_RANGE_MSG)
+        self.elimination_stats = None
+
+    @classmethod
+    def from_coo(cls, rows, cols, values, constant_terms, dimension):
+        rows = np.asarray(rows, dtype=np.intp)
+        cols = np.asarray(cols, dtype=np.intp)
+        values = np.asarray(values, dtype=np.float64)
+        num_rows = len(constant_terms)
+
+        # Sum duplicate (row, col) entries and drop explicit zeros.
+        order = np.lexsort((cols, rows))
+        rows, cols, values = rows[order], cols[order], values[order]
+        if len(rows):
+            starts = np.concatenate(([True], (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])))
+            groups = np.cumsum(starts) - 1
+            values = np.bincount(groups, weights=values)
+            rows, cols = rows[starts], cols[starts]
+            nonzero = values != 0
+            rows, cols, values = rows[nonzero], cols[nonzero], values[nonzero]
+
+        indptr = np.zeros(num_rows + 1, dtype=np.intp)
+        np.cumsum(np.bincount(rows, minlength=num_rows), out=indptr[1:])
+        return cls(indptr, cols, values, constant_terms, dimension)
+
+    @classmethod
+    def from_system(cls, system):
+        matrix = system.to_matrix()
+        rows, cols = np.nonzero(matrix[:, :-1])
+        return cls.from_coo(rows, cols, matrix[rows, cols], matrix[:, -1], system.dimension)
+
+    def to_coo(self):
+        rows = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+        return rows, self.indices.copy(), self.data.copy()
+
+    def to_system(self):
+        return LinearSystem([self[i] for i in range(len(self))])
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    def _row_dicts(self):
+        return [dict(zip(self.indices[start:end].tolist(), self.data[start:end].tolist()))
+                for start, end in zip(self.indptr[:-1], self.indptr[1:])]
+
+    def solve(self):
+        coefficient_max = np.zeros(len(self))
+        np.maximum.at(coefficient_max, self.to_coo()[0], np.abs(self.data))
+        tol = elimination.row_tolerance(np.column_stack([coefficient_max, self.constant_terms])).tolist()
+        rows = self._row_dicts()
+        constants = self.constant_terms.tolist()
+
+        column_rows = [set() for _ in range(self.dimension)]
+        for r, row in enumerate(rows):
+            for c in row:
+                column_rows[c].add(r)
+
+        heap = [(len(column_rows[c]), c) for c in range(self.dimension)]
+        heapq.heapify(heap)
+        done = [False] * self.dimension
+        active = set(range(len(rows)))
+        pivots = []
+        free_columns = []
+        fill_in = 0
+
+        while heap:
+            count, col = heapq.heappop(heap)
+            if done[col]:
+                continue
+            if count != len(column_rows[col]):
+                heapq.heappush(heap, (len(column_rows[col]), col))
+                continue
+            done[col] = True
+            if count == 0:
+                free_columns.append(col)
+                continue
+
+            # Markowitz-style threshold pivoting: among entries that are not
+            # too small relative to the column maximum, take the shortest row.
+            # Entries are measured against their own row's threshold.
+            candidates = column_rows[col]
+            largest = max(abs(rows[r][col]) / tol[r] for r in candidates)
+            if largest <= 1:
+                for r in candidates:
+                    del rows[r][col]
+                column_rows[col] = set()
+                free_columns.append(col)
+                continue
+            pivot_row = min((r for r in candidates if abs(rows[r][col]) / tol[r] >= self.PIVOT_THRESHOLD * largest),
+                            key=lambda r: (len(rows[r]), r))
+
+            active.discard(pivot_row)
+            pivot = rows[pivot_row]
+            for c in pivot:
+                column_rows[c].discard(pivot_row)
+
+            pivot_value = pivot[col]
+            for r in list(column_rows[col]):
+                row = rows[r]
+                factor = row.pop(col) / pivot_value
+                for c, v in pivot.items():
+                    if c == col:
+                        continue
+                    if c in row:
+                        new_value = row[c] - factor * v
+                        if new_value == 0:
+                            del row[c]
+                            column_rows[c].discard(r)
+                        else:
+                            row[c] = new_value
+                    else:
+                        row[c] = -factor * v
+                        column_rows[c].add(r)
+                        fill_in += 1
+                constants[r] -= factor * constants[pivot_row]
+            column_rows[col] = set()
+            for c in pivot:
+                if not done[c]:
+                    heapq.heappush(heap, (len(column_rows[c]), c))
+            pivots.append((col, pivot_row))
+
+        self.elimination_stats = {
+            'nnz': self.nnz,
+            'fill_in': fill_in,
+            'factor_nnz': sum(len(rows[r]) for _, r in pivots),
+            'rank': len(pivots),
+            'column_order': [c for c, _ in pivots],
+        }
+
+        if any(abs(constants[r]) > tol[r] for r in active):
+            raise Exception(LinearSystem.NO_SOLUTIONS_MSG)
+
+        basepoint = self._back_substitute(rows, pivots, constants)
+        if not free_columns:
+            return Vector(basepoint)
+
+        direction_vectors = []
+        for free in free_columns:
+            direction = self._back_substitute(rows, pivots, [0.0] * len(rows), free)
+            direction_vectors.append(Vector(direction))
+        return Parametrization(Vector(basepoint), direction_vectors)
+
+    def _back_substitute(self, rows, pivots, constants, free_column=None):
+        x = [0.0] * self.dimension
+        if free_column is not None:
+            x[free_column] = 1.0
+        for col, r in reversed(pivots):
+            row = rows[r]
+            total = constants[r]
+            for c, v in row.items():
+                if c != col:
+                    total -= v * x[c]
+            x[col] = total / row[col]
+        return x
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, i):
+        start, end = self.indptr[i], self.indptr[i + 1]
+        coordinates = [0.0] * self.dimension
+        for c, v in zip(self.indices[start:end].tolist(), self.data[start:end].tolist()):
+            coordinates[c] = v
+        return Plane(Vector(coordinates), float(self.constant_terms[i]))
+
+    def __str__(self):
+        return 'Sparse Linear System: {} equations, {} unknowns, {} nonzeros'.format(len(self), self.dimension, self.nnz)
+
+
+if __name__ == "__main__":
+    p1 = Plane(normal_vector=Vector([0, 1, 1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1, -1, 1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1, 2, -5]), constant_term=3)
+    s = SparseLinearSystem.from_system(LinearSystem([p1, p2, p3]))
+    x = s.solve()
+    if not all(abs(a - b) < 1e-10 for a, b in zip(x, [23/9., 7/9., 2/9.])):
+        print('test case 1 failed')
+
+    p1 = Plane(normal_vector=Vector([1, 1, 1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1, 1, 1]), constant_term=2)
+    try:
+        SparseLinearSystem.from_system(LinearSystem([p1, p2])).solve()
+        print('test case 2 failed')
+    except Exception as e:
+        if str(e) != LinearSystem.NO_SOLUTIONS_MSG:
+            print('test case 2 failed')
+
+    p1 = Plane(normal_vector=Vector([1, 1, 1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([0, 1, 1]), constant_term=2)
+    solution = SparseLinearSystem.from_system(LinearSystem([p1, p2])).solve()
+    if not (isinstance(solution, Parametrization) and len(solution.direction_vectors) == 1):
+        print('test case 3 failed')
+    for t in [0, 1, -2.5]:
+        point = solution.basepoint.plus(solution.direction_vectors[0].times_scalar(t))
+        if not (abs(p1.normal_vector.dot(point) - 1) < 1e-10 and abs(p2.normal_vector.dot(point) - 2) < 1e-10):
+            print('test case 4 failed')
+
+    # Arrow matrix: eliminating the dense row/column first fills everything in,
+    # a minimum degree ordering leaves it until the end and creates no fill.
+    n = 200
+    rows = list(range(n)) + [0] * (n - 1) + list(range(1, n))
+    cols = list(range(n)) + list(range(1, n)) + [0] * (n - 1)
+    values = [float(n)] + [4.0] * (n - 1) + [1.0] * (2 * (n - 1))
+    s = SparseLinearSystem.from_coo(rows, cols, values, [1.0] * n, n)
+    x = s.solve()
+    if not (s.elimination_stats['fill_in'] == 0 and 0 in s.elimination_stats['column_order'][-2:]):
+        print('test case 5 failed')
+    dense = s.to_system().solve()
+    if not all(abs(a - b) < 1e-10 for a, b in zip(x, dense)):
+        print('test case 6 failed')
+
+    scaled = SparseLinearSystem.from_coo([0, 1, 2], [0, 1, 2], [1e6, 1e-6, 1.0], [1.0, 1.0, 1.0], 3)
+    if not np.allclose(scaled.solve().coordinates, [1e-6, 1e6, 1], rtol=1e-12, atol=0):
+        print('test case 7 failed')
@@ -1,40 +1,65 @@
 import math
 from decimal import *
+
+import instrument
+import wire
+
+
+def is_near_zero(x, eps=1e-10):
+    # Compares in x's own numeric type, so a float is never converted to a
+    # Decimal (or the other way round) just to test it against eps.
+    if isinstance(x, str):
+        x = Decimal(x)
+    return abs(x) < eps
+
+
+class MyDecimal(Decimal):
+    def is_near_zero(self, eps=1e-10):
+        return abs(self) < eps
+
+
 class Vector(object):
     CANNOT_COMPUTE_ANGLE_WITH_ZERO_VECTOR_MSG = 'Cannot compute an angle with the zero vector'
     CANNOT_NORMALIZE_ZERO_VECTOR_MSG = 'Cannot normalize the zero vector'
     NO_UNIQUE_PARALLEL_COMPONENT_MSG = 'No unique parallel component'
     NO_UNIQUE_ORTHOGONAL_COMPONENT_MSG = 'No unique orthogonal component'
     ONLY_DEFINED_IN_TWO_THREE_DIMS_MSG = 'Only defined in two of three dims'
+    VECTOR_IS_IMMUTABLE_MSG = 'Vector is immutable'
+
+    __slots__ = ('coordinates', 'dimension', '_magnitude', '_normalized')
 
     def __init__(self, coordinates):
         try:
             if not coordinates:
                 raise ValueError
-            self.coordinates = tuple(coordinates)
-            self.dimension = len(coordinates)
-            self.current_index = 0
+            coordinates = tuple(coordinates)
+            if instrument.enabled:
+                instrument.count('vectors_created')
+            object.__setattr__(self, 'coordinates', coordinates)
+            object.__setattr__(self, 'dimension', len(coordinates))
+            object.__setattr__(self, '_magnitude', None)
+            object.__setattr__(self, '_normalized', None)
         except ValueError:
             raise ValueError('The coordinates must be nonempty')
 
         except TypeError:
             raise TypeError('The coordinates must be an iterable')
 
+    def __setattr__(self, name, value):
+        raise AttributeError(self.VECTOR_IS_IMMUTABLE_MSG)
+
+    def __delattr__(self, name):
+        raise AttributeError(self.VECTOR_IS_IMMUTABLE_MSG)
+
+    def __reduce__(self):
+        return Vector, (self.coordinates,)
+
     def __iter__(self):
-        self.current_index = 0
-        return self
+        return iter(self.coordinates)
 
     def __getitem__(self, item):
         return self.coordinates[item]
 
-    def __next__(self):
-        if self.current_index >= len(self.coordinates):
-            raise StopIteration
-        else:
-            current_value = self.coordinates[self.current_index]
-            self.current_index += 1
-            return current_value
-
     def plus(self, v):
         new_coordinate = [x + y for x, y in zip(self.coordinates, v.coordinates)]
         return Vector(new_coordinate)
@@ -48,15 +73,19 @@ class Vector(object):
         return Vector(new_coordinate)
 
     def magnitude(self):
-        return math.sqrt(sum([x ** 2 for x in self.coordinates]))
+        if self._magnitude is None:
+            object.__setattr__(self, '_magnitude', math.sqrt(sum([x * x for x in self.coordinates])))
+        return self._magnitude
 
     def normalized(self):
-        try:
-            magnitude_inverse = 1 / self.magnitude()
-            new_coordinate = [magnitude_inverse * x for x in self.coordinates]
-            return Vector(new_coordinate)
-        except ZeroDivisionError:
-            raise Exception(self.CANNOT_NORMALIZE_ZERO_VECTOR_MSG)
+        if self._normalized is None:
+            try:
+                magnitude_inverse = 1 / self.magnitude()
+                new_coordinate = [magnitude_inverse * x for x in self.coordinates]
+                object.__setattr__(self, '_normalized', Vector(new_coordinate))
+            except ZeroDivisionError:
+                raise Exception(self.CANNOT_NORMALIZE_ZERO_VECTOR_MSG)
+        return self._normalized
 
     def dot(self, v):
         return round(sum([x * y for x, y in zip(self.coordinates, v.coordinates)]), 10)
@@ -131,12 +160,36 @@ class Vector(object):
         cross_product = self.cross(v)
         return cross_product.magnitude() / 2
 
+    def to_bytes(self, encoding='auto'):
+        encoding = wire.choose_encoding(self.coordinates, encoding)
+        return wire.encode(wire.VECTOR, 1, self.dimension, self.coordinates, encoding)
+
+    @classmethod
+    def from_bytes(cls, data):
+        encoding, rows, dimension, payload = wire.decode_header(data, wire.VECTOR)
+        if encoding == wire.FLOAT64:
+            return cls(wire.float64_view(payload, dimension).tolist())
+        return cls(wire.decode_exact(payload, dimension))
+
+    def as_memoryview(self):
+        return memoryview(wire.pack_float64(self.coordinates))
+
+    # PEP 688: memoryview(v) works directly on Python 3.12+ only;
+    # as_memoryview() is the supported path on every version.
+    def __buffer__(self, flags):
+        return self.as_memoryview()
+
     def __str__(self):
         return 'Vector: {}'.format(self.coordinates)
 
     def __eq__(self, v):
+        if not isinstance(v, Vector):
+            return NotImplemented
         return self.coordinates == v.coordinates
 
+    def __hash__(self):
+        return hash(self.coordinates)
+
 if __name__ == "__main__":
     print(getcontext().prec)
     # Quiz 1
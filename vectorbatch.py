@@ -0,0 +1,159 @@
+import numpy as np
+
+from vector import Vector
+
+
+def round_like_python(values, ndigits):
+    # Python's round(x, ndigits) for every element of a float64 array, bit
+    # for bit (0 <= ndigits <= 22, so 10 ** ndigits is an exact double).
+    # round() picks the nearest integer k to x * 10 ** ndigits and returns
+    # the double nearest to k / 10 ** ndigits; rint of the float product
+    # finds the same k unless the product lies within its rounding error of
+    # a halfway point, and dividing the exact k by the exact power of ten is
+    # correctly rounded. Those few elements, and ones that are too large or
+    # not finite, go through round() itself.
+    values = np.asarray(values, dtype=np.float64)
+    shape = values.shape
+    values = values.ravel()
+    scale = 10.0 ** ndigits
+    with np.errstate(over='ignore', invalid='ignore'):
+        scaled = values * scale
+        result = np.rint(scaled) / scale
+        magnitude = np.abs(scaled)
+        distance = np.abs(scaled - np.floor(scaled) - 0.5)
+        safe = (magnitude < 2.0 ** 52) & (distance > magnitude * 2.0 ** -52 + 2.0 ** -60)
+    if not safe.all():
+        unsafe = np.flatnonzero(~safe)
+        result[unsafe] = [round(x, ndigits) for x in values[unsafe].tolist()]
+    return result.reshape(shape)
+
+
+def sequential_sum(products):
+    # Sums over the last axis one column at a time, so every row is summed
+    # in the same order as Vector's built-in sum().
+    total = products[..., 0].copy()
+    for j in range(1, products.shape[-1]):
+        total += products[..., j]
+    return total
+
+
+class VectorBatch(object):
+    CANNOT_NORMALIZE_ZERO_VECTOR_MSG = Vector.CANNOT_NORMALIZE_ZERO_VECTOR_MSG
+    BATCH_MUST_BE_TWO_DIMENSIONAL_MSG = 'The coordinates must form an (N, d) array'
+    DIMENSIONS_MUST_MATCH_MSG = 'All vectors must live in the same dimension'
+
+    def __init__(self, coordinates):
+        coordinates = np.ascontiguousarray(coordinates, dtype=np.float64)
+        if coordinates.ndim != 2 or coordinates.shape[1] == 0:
+            raise ValueError(self.BATCH_MUST_BE_TWO_DIMENSIONAL_MSG)
+        self.coordinates = coordinates
+        self.dimension = coordinates.shape[1]
+
+    @classmethod
+    def from_vectors(cls, vectors):
+        vectors = list(vectors)
+        if not vectors:
+            raise ValueError('The coordinates must be nonempty')
+        d = vectors[0].dimension
+        for v in vectors:
+            if v.dimension != d:
+                raise ValueError(cls.DIMENSIONS_MUST_MATCH_MSG)
+        return cls([v.coordinates for v in vectors])
+
+    def to_vectors(self):
+        return [Vector(row) for row in self.coordinates.tolist()]
+
+    def _other(self, v):
+        if isinstance(v, VectorBatch):
+            other = v.coordinates
+        elif isinstance(v, Vector):
+            other = np.asarray(v.coordinates, dtype=np.float64)
+        else:
+            other = np.asarray(v, dtype=np.float64)
+        if other.shape[-1] != self.dimension:
+            raise ValueError(self.DIMENSIONS_MUST_MATCH_MSG)
+        return other
+
+    def plus(self, v):
+        return VectorBatch(self.coordinates + self._other(v))
+
+    def minus(self, v):
+        return VectorBatch(self.coordinates - self._other(v))
+
+    def times_scalar(self, c):
+        c = np.asarray(c, dtype=np.float64)
+        if c.ndim == 1:
+            c = c[:, np.newaxis]
+        return VectorBatch(c * self.coordinates)
+
+    def magnitude(self):
+        return np.sqrt(sequential_sum(self.coordinates * self.coordinates))
+
+    def normalized(self):
+        magnitude = self.magnitude()
+        if not magnitude.all():
+            raise Exception(self.CANNOT_NORMALIZE_ZERO_VECTOR_MSG)
+        magnitude_inverse = 1 / magnitude
+        return VectorBatch(magnitude_inverse[:, np.newaxis] * self.coordinates)
+
+    def dot(self, v):
+        products = self.coordinates * self._other(v)
+        total = sequential_sum(products)
+        # Python's round() is correctly rounded, np.round() is not, and the
+        # results must agree with Vector.dot bit for bit.
+        return round_like_python(total, 10)
+
+    def __len__(self):
+        return self.coordinates.shape[0]
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return Vector(self.coordinates[item].tolist())
+        return VectorBatch(self.coordinates[item])
+
+    def __iter__(self):
+        for row in self.coordinates.tolist():
+            yield Vector(row)
+
+    def __str__(self):
+        return 'VectorBatch: {} vectors in {} dims'.format(len(self), self.dimension)
+
+    def __eq__(self, v):
+        if not isinstance(v, VectorBatch):
+            return NotImplemented
+        return np.array_equal(self.coordinates, v.coordinates)
+
+
+if __name__ == "__main__":
+    vectors = [Vector([8.218, -9.341]), Vector([7.119, 8.215]), Vector([-0.221, 7.437]), Vector([5.581, -2.136])]
+    others = [Vector([-1.129, 2.111]), Vector([-8.223, 0.878]), Vector([8.813, -1.331]), Vector([1.996, 3.108])]
+    batch = VectorBatch.from_vectors(vectors)
+    other_batch = VectorBatch.from_vectors(others)
+
+    if not batch.plus(other_batch).to_vectors() == [v.plus(w) for v, w in zip(vectors, others)]:
+        print('test case 1 failed')
+
+    if not batch.minus(others[0]).to_vectors() == [v.minus(others[0]) for v in vectors]:
+        print('test case 2 failed')
+
+    if not batch.times_scalar(7.41).to_vectors() == [v.times_scalar(7.41) for v in vectors]:
+        print('test case 3 failed')
+
+    if not batch.magnitude().tolist() == [v.magnitude() for v in vectors]:
+        print('test case 4 failed')
+
+    if not batch.normalized().to_vectors() == [v.normalized() for v in vectors]:
+        print('test case 5 failed')
+
+    if not batch.dot(other_batch).tolist() == [v.dot(w) for v, w in zip(vectors, others)]:
+        print('test case 6 failed')
+
+    if not batch.dot(others[1]).tolist() == [v.dot(others[1]) for v in vectors]:
+        print('test case 7 failed')
+
+    try:
+        VectorBatch([[1, 2], [0, 0]]).normalized()
+        print('test case 8 failed')
+    except Exception as e:
+        if str(e) != Vector.CANNOT_NORMALIZE_ZERO_VECTOR_MSG:
+            print('test case 8 failed')
@@ -0,0 +1,364 @@
+import heapq
+import math
+
+import numpy as np
+
+from vector import Vector
+from vectorbatch import VectorBatch
+
+
+def _as_array(vectors):
+    if isinstance(vectors, VectorBatch):
+        return vectors.coordinates
+    if isinstance(vectors, np.ndarray):
+        return np.ascontiguousarray(vectors, dtype=np.float64)
+    return np.array([v.coordinates if isinstance(v, Vector) else v for v in vectors], dtype=np.float64)
+
+
+def _as_query(query, dimension):
+    q = np.asarray(query.coordinates if isinstance(query, Vector) else query, dtype=np.float64)
+    if q.shape != (dimension,):
+        raise Exception(VectorIndex.DIMENSIONS_MUST_MATCH_MSG)
+    return q
+
+
+class VectorIndex(object):
+    # Euclidean nearest neighbours. The default mode is a KD-tree whose
+    # leaves are contiguous slices of the reordered points, scanned with
+    # numpy; mode='exact' scans everything and is there to validate it.
+    DIMENSIONS_MUST_MATCH_MSG = 'All vectors must live in the same dimension'
+    EMPTY_INDEX_MSG = 'Cannot build an index over no vectors'
+    UNKNOWN_MODE_MSG = 'Unknown index mode'
+
+    def __init__(self, vectors, mode='kdtree', leaf_size=32):
+        points = _as_array(vectors)
+        if points.ndim != 2 or len(points) == 0:
+            raise Exception(self.EMPTY_INDEX_MSG)
+        if mode not in ('kdtree', 'exact'):
+            raise Exception(self.UNKNOWN_MODE_MSG)
+        self.mode = mode
+        self.dimension = points.shape[1]
+        self.leaf_size = leaf_size
+        self.order = np.arange(len(points))
+        self.points = points.copy()
+        self._start = []
+        self._end = []
+        self._split_dim = []
+        self._split_value = []
+        self._children = []
+        if mode == 'kdtree':
+            self._build(0, len(points))
+
+    def _build(self, start, end):
+        node = len(self._start)
+        self._start.append(start)
+        self._end.append(end)
+        self._split_dim.append(-1)
+        self._split_value.append(0.0)
+        self._children.append(None)
+        if end - start <= self.leaf_size:
+            return node
+        points = self.points[start:end]
+        spread = points.max(axis=0) - points.min(axis=0)
+        dim = int(np.argmax(spread))
+        if spread[dim] == 0:
+            return node
+        mid = (end - start) // 2
+        partition = np.argpartition(points[:, dim], mid)
+        self.points[start:end] = points[partition]
+        self.order[start:end] = self.order[start:end][partition]
+        self._split_dim[node] = dim
+        self._split_value[node] = float(self.points[start + mid, dim])
+        left = self._build(start, start + mid)
+        right = self._build(start + mid, end)
+        self._children[node] = (left, right)
+        return node
+
+    def __len__(self):
+        return len(self.points)
+
+    def _leaf_distances(self, node, q):
+        start, end = self._start[node], self._end[node]
+        diff = self.points[start:end] - q
+        return start, np.einsum('ij,ij->i', diff, diff)
+
+    def _nearest(self, q, k):
+        best = []
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if len(best) == k and bound >= -best[0][0]:
+                continue
+            children = self._children[node]
+            if children is None:
+                start, distances = self._leaf_distances(node, q)
+                if len(distances) > k:
+                    keep = np.argpartition(distances, k - 1)[:k]
+                else:
+                    keep = range(len(distances))
+                for i in keep:
+                    item = (-float(distances[i]), start + int(i))
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif item > best[0]:
+                        heapq.heapreplace(best, item)
+                continue
+            diff = q[self._split_dim[node]] - self._split_value[node]
+            near, far = children if diff < 0 else children[::-1]
+            stack.append((far, max(bound, diff * diff)))
+            stack.append((near, bound))
+        best.sort(reverse=True)
+        positions = np.array([p for _, p in best], dtype=np.intp)
+        return self.order[positions], np.sqrt([-d for d, _ in best])
+
+    def _within(self, q, radius):
+        limit = radius * radius
+        positions = []
+        distances = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            children = self._children[node]
+            if children is None:
+                start, d = self._leaf_distances(node, q)
+                hits = np.flatnonzero(d <= limit)
+                positions.append(start + hits)
+                distances.append(d[hits])
+                continue
+            diff = q[self._split_dim[node]] - self._split_value[node]
+            near, far = children if diff < 0 else children[::-1]
+            if diff * diff <= limit:
+                stack.append(far)
+            stack.append(near)
+        return self._sorted(np.concatenate(positions), np.concatenate(distances))
+
+    def _sorted(self, positions, squared_distances):
+        ranking = np.argsort(squared_distances, kind='stable')
+        return self.order[positions[ranking]], np.sqrt(squared_distances[ranking])
+
+    def _exact_distances(self, q):
+        diff = self.points - q
+        return np.einsum('ij,ij->i', diff, diff)
+
+    def nearest(self, query, k=1):
+        q = _as_query(query, self.dimension)
+        k = min(k, len(self))
+        if self.mode == 'exact':
+            d = self._exact_distances(q)
+            positions = np.argpartition(d, k - 1)[:k] if k < len(d) else np.arange(len(d))
+            return self._sorted(positions, d[positions])
+        return self._nearest(q, k)
+
+    def within_distance(self, query, radius):
+        q = _as_query(query, self.dimension)
+        if self.mode == 'exact':
+            d = self._exact_distances(q)
+            positions = np.flatnonzero(d <= radius * radius)
+            return self._sorted(positions, d[positions])
+        return self._within(q, radius)
+
+    def nearest_batch(self, queries, k=1):
+        queries = _as_array(queries)
+        k = min(k, len(self))
+        indices = np.empty((len(queries), k), dtype=np.intp)
+        distances = np.empty((len(queries), k))
+        for i, q in enumerate(queries):
+            indices[i], distances[i] = self.nearest(q, k)
+        return indices, distances
+
+    def within_distance_batch(self, queries, radius):
+        return [self.within_distance(q, radius) for q in _as_array(queries)]
+
+
+class AngularIndex(object):
+    # Angular nearest neighbours. On unit vectors the chord length
+    # 2 sin(angle / 2) grows with the angle, so in few dimensions a KD-tree
+    # over the normalized vectors answers angle queries exactly. In many
+    # dimensions KD-trees degrade to a full scan and random-hyperplane LSH
+    # takes over: each table hashes a unit vector to the signs of its
+    # projections onto num_bits random normals, so vectors at a small angle
+    # share a bucket with high probability. A query also probes the buckets
+    # reached by flipping its least certain bits, and every candidate is
+    # ranked by its exact angle. Zero vectors have no direction and are left
+    # out of the index.
+    CANNOT_COMPUTE_ANGLE_WITH_ZERO_VECTOR_MSG = Vector.CANNOT_COMPUTE_ANGLE_WITH_ZERO_VECTOR_MSG
+    EMPTY_INDEX_MSG = VectorIndex.EMPTY_INDEX_MSG
+    UNKNOWN_MODE_MSG = VectorIndex.UNKNOWN_MODE_MSG
+
+    KDTREE_MAX_DIMENSION = 16
+    BUCKET_TARGET = 32
+
+    def __init__(self, vectors, mode='auto', num_tables=8, num_bits=None, probes=2, seed=0, leaf_size=32):
+        points = _as_array(vectors)
+        if points.ndim != 2 or len(points) == 0:
+            raise Exception(self.EMPTY_INDEX_MSG)
+        if mode == 'auto':
+            mode = 'kdtree' if points.shape[1] <= self.KDTREE_MAX_DIMENSION else 'lsh'
+        if mode not in ('kdtree', 'lsh', 'exact'):
+            raise Exception(self.UNKNOWN_MODE_MSG)
+        self.mode = mode
+        self.dimension = points.shape[1]
+        norms = np.linalg.norm(points, axis=1)
+        self.ids = np.flatnonzero(norms > 0)
+        self.units = points[self.ids] / norms[self.ids, np.newaxis]
+        if len(self.ids) == 0:
+            raise Exception(self.EMPTY_INDEX_MSG)
+
+        if mode == 'kdtree':
+            self._tree = VectorIndex(self.units, leaf_size=leaf_size)
+
+        if num_bits is None:
+            num_bits = int(math.log2(max(len(self.ids), 2) / self.BUCKET_TARGET))
+        self.num_bits = min(max(num_bits, 1), 30)
+        self.probes = min(probes, self.num_bits)
+        self._weights = 1 << np.arange(self.num_bits, dtype=np.int64)
+        self._normals = np.random.default_rng(seed).normal(size=(num_tables, self.num_bits, self.dimension))
+        self._tables = []
+        if mode == 'lsh':
+            for normals in self._normals:
+                codes = (self.units @ normals.T > 0) @ self._weights
+                order = np.argsort(codes, kind='stable')
+                keys, starts = np.unique(codes[order], return_index=True)
+                self._tables.append(dict(zip(keys.tolist(), np.split(order, starts[1:]))))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _unit_query(self, query):
+        q = _as_query(query, self.dimension)
+        magnitude = np.linalg.norm(q)
+        if magnitude == 0:
+            raise Exception(self.CANNOT_COMPUTE_ANGLE_WITH_ZERO_VECTOR_MSG)
+        return q / magnitude
+
+    def _probe_codes(self, projections):
+        code = int((projections > 0) @ self._weights)
+        yield code
+        for bit in np.argsort(np.abs(projections))[:self.probes]:
+            yield code ^ (1 << int(bit))
+
+    def _tree_candidates(self, u, either_direction, k=None, angle=None):
+        directions = (u, -u) if either_direction else (u,)
+        if k is not None:
+            found = [self._tree.nearest(d, k)[0] for d in directions]
+        else:
+            chord = 2 * math.sin(min(angle, math.pi) / 2) * (1 + 1e-12)
+            found = [self._tree.within_distance(d, chord)[0] for d in directions]
+        return np.unique(np.concatenate(found))
+
+    def _candidates(self, u, either_direction):
+        found = []
+        for normals, table in zip(self._normals, self._tables):
+            projections = normals @ u
+            signs = (projections, -projections) if either_direction else (projections,)
+            for p in signs:
+                for code in self._probe_codes(p):
+                    bucket = table.get(code)
+                    if bucket is not None:
+                        found.append(bucket)
+        if not found:
+            return np.zeros(0, dtype=np.intp)
+        return np.unique(np.concatenate(found))
+
+    def _angles(self, rows, u, either_direction):
+        cosines = self.units[rows] @ u
+        if either_direction:
+            cosines = np.abs(cosines)
+        return np.arccos(np.clip(cosines, -1.0, 1.0))
+
+    def _ranked(self, rows, angles, k=None):
+        ranking = np.argsort(angles, kind='stable')
+        if k is not None:
+            ranking = ranking[:k]
+        return self.ids[rows[ranking]], angles[ranking]
+
+    def nearest(self, query, k=1, either_direction=False, in_degrees=False):
+        # either_direction ranks v and -v alike, the way Vector.is_parallel
+        # treats them; a query whose buckets hold fewer than k candidates
+        # falls back to the exact scan.
+        u = self._unit_query(query)
+        k = min(k, len(self))
+        if self.mode == 'kdtree':
+            rows = self._tree_candidates(u, either_direction, k=k)
+        elif self.mode == 'lsh':
+            rows = self._candidates(u, either_direction)
+        if self.mode == 'exact' or len(rows) < k:
+            rows = np.arange(len(self))
+        indices, angles = self._ranked(rows, self._angles(rows, u, either_direction), k)
+        return indices, np.degrees(angles) if in_degrees else angles
+
+    def within_angle(self, query, angle, either_direction=False, in_degrees=False):
+        # In 'lsh' mode this is approximate: a vector that shares no probed
+        # bucket with the query is missed even when it is within the angle.
+        u = self._unit_query(query)
+        limit = math.radians(angle) if in_degrees else angle
+        if self.mode == 'kdtree':
+            rows = self._tree_candidates(u, either_direction, angle=limit)
+        elif self.mode == 'lsh':
+            rows = self._candidates(u, either_direction)
+        else:
+            rows = np.arange(len(self))
+        angles = self._angles(rows, u, either_direction)
+        hits = angles <= limit
+        indices, angles = self._ranked(rows[hits], angles[hits])
+        return indices, np.degrees(angles) if in_degrees else angles
+
+    def nearest_batch(self, queries, k=1, either_direction=False, in_degrees=False):
+        queries = _as_array(queries)
+        k = min(k, len(self))
+        indices = np.empty((len(queries), k), dtype=np.intp)
+        angles = np.empty((len(queries), k))
+        for i, q in enumerate(queries):
+            indices[i], angles[i] = self.nearest(q, k, either_direction, in_degrees)
+        return indices, angles
+
+    def within_angle_batch(self, queries, angle, either_direction=False, in_degrees=False):
+        return [self.within_angle(q, angle, either_direction, in_degrees) for q in _as_array(queries)]
+
+
+if __name__ == "__main__":
+    vectors = [Vector([1, 0, 0]), Vector([0, 2, 0]), Vector([0, 0, 3]), Vector([-4, 0, 0]), Vector([0, 0, 0])]
+    index = VectorIndex(vectors, leaf_size=1)
+    indices, distances = index.nearest(Vector([0.9, 0.1, 0]), k=2)
+    if not (indices.tolist() == [0, 4] and abs(distances[0] - math.sqrt(0.02)) < 1e-12):
+        print('test case 1 failed')
+
+    indices, _ = index.within_distance(Vector([0, 0, 0]), 2)
+    if not indices.tolist() == [4, 0, 1]:
+        print('test case 2 failed')
+
+    for mode in ('kdtree', 'lsh', 'exact'):
+        angular = AngularIndex(vectors, mode=mode, num_bits=2)
+        indices, angles = angular.nearest(Vector([-1, 0.01, 0]), k=1)
+        if not (indices.tolist() == [3] and abs(angles[0] - Vector([-1, 0.01, 0]).angle_with(vectors[3])) < 1e-6):
+            print('test case 3 failed for {}'.format(mode))
+
+        indices, angles = angular.nearest(Vector([1, 0.01, 0]), k=2, either_direction=True)
+        if not (sorted(indices.tolist()) == [0, 3] and abs(angles[0] - angles[1]) < 1e-12):
+            print('test case 4 failed for {}'.format(mode))
+
+        indices, _ = angular.within_angle(Vector([0, 1, 1]), 46, in_degrees=True)
+        if not sorted(indices.tolist()) == [1, 2]:
+            print('test case 5 failed for {}'.format(mode))
+
+    rng = np.random.default_rng(0)
+    points = rng.normal(size=(20000, 3))
+    queries = rng.normal(size=(50, 3))
+    tree, brute = VectorIndex(points), VectorIndex(points, mode='exact')
+    if not np.array_equal(tree.nearest_batch(queries, k=5)[0], brute.nearest_batch(queries, k=5)[0]):
+        print('test case 6 failed')
+    if not all(np.array_equal(a[0], b[0]) for a, b in zip(tree.within_distance_batch(queries, 0.2),
+                                                          brute.within_distance_batch(queries, 0.2))):
+        print('test case 7 failed')
+
+    brute = AngularIndex(points, mode='exact')
+    expected = brute.nearest_batch(queries, k=3, either_direction=True)[0]
+    if not np.array_equal(AngularIndex(points).nearest_batch(queries, k=3, either_direction=True)[0], expected):
+        print('test case 8 failed')
+
+    points = rng.normal(size=(20000, 32))
+    queries = points[:50] + rng.normal(scale=0.1, size=(50, 32))
+    lsh, brute = AngularIndex(points), AngularIndex(points, mode='exact')
+    if not (lsh.mode == 'lsh' and
+                    (lsh.nearest_batch(queries)[0] == brute.nearest_batch(queries)[0]).mean() >= 0.9):
+        print('test case 9 failed')